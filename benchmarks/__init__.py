@@ -0,0 +1 @@
+# Benchmarks for the analyzers and endpoints, see benchmarks/run.py
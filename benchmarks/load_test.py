@@ -0,0 +1,280 @@
+"""Load test simulating concurrent live-analysis users against a local server.
+
+Start the server with the SQLite backend first, e.g.
+
+  DATABASE_URL=sqlite:////tmp/wellness_load.db \\
+      WELLNESS_SAMPLE_DIR=/tmp/wellness_load_samples python app.py
+
+then ramp up the number of simulated users:
+
+  python -m benchmarks.load_test --url http://127.0.0.1:5000 \\
+      --database /tmp/wellness_load.db --sample-dir /tmp/wellness_load_samples \\
+      --users 1,2,4,8,16 --duration 30
+
+Each user signs up, logs in, posts a webcam frame to /analyze_face every
+--frame-interval seconds, uploads an audio clip to /analyze_voice every
+--voice-interval seconds and polls /get_wellness_data every
+--poll-interval seconds, like live_analysis.html does. The frames show a
+moving face, so each one is analyzed in full; --still sends a user
+sitting still, whose frames mostly reuse the last detection. For every
+concurrency step the script reports throughput, error rate, the write
+rates of the sample store and the database, and latency percentiles per
+endpoint.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks import synthetic
+from utils.sample_store import SampleStore
+
+
+def encode_multipart(field, filename, data, content_type):
+    """multipart/form-data body with a single file field"""
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+class Stats:
+    """Latencies and errors per endpoint, shared by all user threads"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects (e.g. after login) instead of following them"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class SimulatedUser(threading.Thread):
+    def __init__(self, index, args, stats, frames, audio, stop_event):
+        super().__init__(daemon=True)
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.frames = frames
+        self.audio = audio
+        self.stop_event = stop_event
+        self.counter = 0
+        self.frame_index = 0
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, endpoint, path, data=None, content_type=None):
+        """Status code and redirect location, status None if the request failed"""
+        url = self.args.url.rstrip('/') + path
+        headers = {'Content-Type': content_type} if content_type else {}
+        start = time.perf_counter()
+        status = location = None
+        try:
+            with self.opener.open(urllib.request.Request(url, data=data, headers=headers),
+                                  timeout=self.args.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            # Also raised for the redirects NoRedirect doesn't follow
+            status, location = e.code, e.headers.get('Location')
+        except (urllib.error.URLError, OSError):
+            pass
+        if endpoint:
+            # The API endpoints answer directly; a redirect (to the login
+            # page) means the request wasn't served
+            ok = status is not None and 200 <= status < 300
+            self.stats.record(endpoint, time.perf_counter() - start, ok)
+        return status, location
+
+    def login(self):
+        name = f'load{self.args.run_id}_{self.index}'
+        form = {'username': name, 'email': f'{name}@example.com', 'password': 'load-test'}
+        self.request(None, '/signup', urllib.parse.urlencode(form).encode(),
+                     'application/x-www-form-urlencoded')
+        status, location = self.request(None, '/login', urllib.parse.urlencode(form).encode(),
+                                        'application/x-www-form-urlencoded')
+        # A successful login redirects to the menu, a failed one re-renders the form
+        return status == 302 and urllib.parse.urlparse(location or '').path == '/menu'
+
+    def unique(self, data):
+        # Trailing bytes keep each upload distinct so the result cache misses
+        self.counter += 1
+        return data + f'{self.index}:{self.counter}'.encode()
+
+    def post_frame(self):
+        frame = self.frames[self.frame_index % len(self.frames)]
+        self.frame_index += 1
+        body, content_type = encode_multipart('image', 'frame.jpg', self.unique(frame), 'image/jpeg')
+        self.request('analyze_face', '/analyze_face', body, content_type)
+
+    def post_audio(self):
+        body, content_type = encode_multipart('audio', 'clip.wav', self.unique(self.audio), 'audio/wav')
+        self.request('analyze_voice', '/analyze_voice', body, content_type)
+
+    def poll(self):
+        self.request('get_wellness_data', '/get_wellness_data')
+
+    def run(self):
+        if not self.login():
+            self.stats.record('login', 0.0, False)
+            return
+
+        # Spread users out so they don't all fire on the same tick
+        now = time.monotonic()
+        offset = (self.index % 10) / 10
+        schedule = [
+            [now + offset * self.args.frame_interval, self.args.frame_interval, self.post_frame],
+            [now + offset * self.args.voice_interval, self.args.voice_interval, self.post_audio],
+            [now + offset * self.args.poll_interval, self.args.poll_interval, self.poll],
+        ]
+        while not self.stop_event.is_set():
+            task = min(schedule, key=lambda item: item[0])
+            delay = task[0] - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            task[2]()
+            task[0] += task[1]
+
+
+def count_samples(sample_dir):
+    """Samples in the server's sample store"""
+    if not sample_dir:
+        return None
+    if not os.path.isdir(sample_dir):
+        return 0  # created with the first sample
+    store = SampleStore(sample_dir)
+    return sum(len(store.read_day(user_id, day)['timestamp'])
+               for user_id in store.users() for day in store.days(user_id))
+
+
+def count_rows(database):
+    """Session summaries in the server's database, the only rows it writes per user"""
+    if not database or not os.path.exists(database):
+        return None
+    with sqlite3.connect(database) as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        if 'session_summary' not in tables:
+            return 0
+        return conn.execute('SELECT COUNT(*) FROM session_summary').fetchone()[0]
+
+
+def run_step(users, args, frames, audio):
+    stats = Stats()
+    stop_event = threading.Event()
+    rows_before = count_rows(args.database)
+    samples_before = count_samples(args.sample_dir)
+
+    threads = [SimulatedUser(i, args, stats, frames, audio, stop_event) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join(args.timeout)
+
+    rows_after = count_rows(args.database)
+    samples_after = count_samples(args.sample_dir)
+    report = {'users': users, 'endpoints': {}}
+    total_requests = total_errors = 0
+    for endpoint, latencies in sorted(stats.latencies.items()):
+        latencies = np.array(latencies) * 1000
+        errors = stats.errors[endpoint]
+        total_requests += len(latencies)
+        total_errors += errors
+        report['endpoints'][endpoint] = {
+            'requests': len(latencies),
+            'throughput_per_s': len(latencies) / args.duration,
+            'error_rate': errors / len(latencies),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+        }
+    report['throughput_per_s'] = total_requests / args.duration
+    report['error_rate'] = total_errors / total_requests if total_requests else 0.0
+    if rows_before is not None and rows_after is not None:
+        report['db_writes_per_s'] = (rows_after - rows_before) / args.duration
+    if samples_before is not None and samples_after is not None:
+        report['sample_writes_per_s'] = (samples_after - samples_before) / args.duration
+    return report
+
+
+def print_report(report):
+    rates = {}
+    for name in ('sample_writes_per_s', 'db_writes_per_s'):
+        rate = report.get(name)
+        rates[name] = f'{rate:.1f}/s' if rate is not None else 'n/a'
+    print(f"\n{report['users']} users: {report['throughput_per_s']:.1f} req/s, "
+          f"errors {report['error_rate']:.1%}, sample writes {rates['sample_writes_per_s']}, "
+          f"db writes {rates['db_writes_per_s']}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"  {endpoint:20s} {stats['throughput_per_s']:7.1f}/s  err {stats['error_rate']:6.1%}  "
+              f"p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--database', default=None,
+                        help="the server's SQLite file, to measure the DB write rate")
+    parser.add_argument('--sample-dir', default=None,
+                        help="the server's WELLNESS_SAMPLE_DIR, to measure the sample write rate")
+    parser.add_argument('--users', default='1,2,4,8,16', help='comma-separated concurrency steps')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per step')
+    parser.add_argument('--frame-interval', type=float, default=1.0)
+    parser.add_argument('--voice-interval', type=float, default=30.0)
+    parser.add_argument('--poll-interval', type=float, default=5.0)
+    parser.add_argument('--voice-seconds', type=float, default=5.0, help='length of the uploaded clip')
+    parser.add_argument('--still', action='store_true',
+                        help='users sit still, so most frames reuse the last face detection')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', default=None, help='write the reports as JSON')
+    args = parser.parse_args(argv)
+    args.run_id = uuid.uuid4().hex[:6]
+
+    import cv2
+    # Moving faces by default: every frame gets a full analysis
+    frames = [cv2.imencode('.jpg', frame)[1].tobytes()
+              for frame in synthetic.face_frames(640, 480, motion=not args.still)]
+    audio_path = os.path.join(tempfile.mkdtemp(), 'clip.wav')
+    synthetic.write_wav(audio_path, synthetic.speech_like_audio(args.voice_seconds))
+    with open(audio_path, 'rb') as f:
+        audio = f.read()
+
+    reports = []
+    for users in [int(n) for n in args.users.split(',')]:
+        report = run_step(users, args, frames, audio)
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReports written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""Benchmarks for the analyzers, the webcam loop and the Flask endpoints.
+
+Every benchmark runs in a fresh process on synthetic input generated
+locally, so results are reproducible and peak RSS is per benchmark.
+
+  python -m benchmarks.run --output before.json
+  python -m benchmarks.run --only face --quick
+  python -m benchmarks.run compare before.json after.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import synthetic
+
+# name -> (setup function, iterations, quick iterations)
+BENCHMARKS = {}
+
+
+def benchmark(name, iterations=50, quick=10):
+    def register(setup):
+        BENCHMARKS[name] = (setup, iterations, quick)
+        return setup
+    return register
+
+
+def _face_analyze(width, height):
+    def setup():
+        from utils.face_analyzer import FaceAnalyzer
+        # Full analysis of every frame, the same frame would otherwise be reused
+        analyzer = FaceAnalyzer(change_threshold=None)
+        frame = synthetic.render_face(width, height)
+        return lambda: analyzer.analyze(frame)
+    return setup
+
+
+benchmark('face_analyze_480p')(_face_analyze(640, 480))
+benchmark('face_analyze_720p')(_face_analyze(1280, 720))
+benchmark('face_analyze_1080p', iterations=30)(_face_analyze(1920, 1080))
+
+
+@benchmark('face_analyze_still_480p', iterations=200, quick=30)
+def face_analyze_still():
+    """A user sitting still: sensor noise only, mostly reusing detections"""
+    from utils.face_analyzer import FaceAnalyzer
+    analyzer = FaceAnalyzer()
+    frames = synthetic.face_frames(640, 480, motion=False)
+    counter = iter(range(10 ** 9))
+    return lambda: analyzer.analyze(frames[next(counter) % len(frames)])
+
+
+@benchmark('face_expressions_batch32', iterations=50)
+def face_expressions_batch():
+    from utils.expression_features import ExpressionFeatureExtractor
+    extractor = ExpressionFeatureExtractor()
+    frame = synthetic.render_face(1280, 720)
+    chips = extractor.make_chips(frame, [synthetic.face_roi(1280, 720)] * 32)
+    return lambda: extractor.stress_scores(chips)
+
+
+def _voice_analyze(duration):
+    def setup():
+        from utils.voice_analyzer import VoiceAnalyzer
+        analyzer = VoiceAnalyzer()
+        path = os.path.join(tempfile.mkdtemp(), 'speech.wav')
+        synthetic.write_wav(path, synthetic.speech_like_audio(duration), analyzer.sample_rate)
+        # First call compiles librosa's numba code, keep it out of the timings
+        analyzer.analyze_audio(path)
+        return lambda: analyzer.analyze_audio(path)
+    return setup
+
+
+benchmark('voice_analyze_10s', iterations=10, quick=3)(_voice_analyze(10.0))
+benchmark('voice_analyze_30s', iterations=5, quick=2)(_voice_analyze(30.0))
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture(0), serving synthetic frames in a loop"""
+
+    def __init__(self, motion=True):
+        self.frames = synthetic.face_frames(640, 480, motion=motion)
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return True, frame.copy()
+
+    def release(self):
+        pass
+
+
+def _import_app():
+    """The Flask app module, using a throwaway SQLite database and sample store"""
+    scratch = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(scratch, 'bench.db'))
+    os.environ.setdefault('WELLNESS_SAMPLE_DIR', os.path.join(scratch, 'samples'))
+    import app as app_module
+    return app_module
+
+
+def _generate_frames(motion):
+    def setup():
+        import webcam_app
+        webcam_app.cv2.VideoCapture = lambda *args: FakeCapture(motion)
+        frames = webcam_app.generate_frames()
+        return lambda: next(frames)
+    return setup
+
+
+# A moving user needs a full detection on every frame, a still one mostly reuses them
+benchmark('generate_frames', iterations=200, quick=30)(_generate_frames(True))
+benchmark('generate_frames_still', iterations=200, quick=30)(_generate_frames(False))
+
+
+def _logged_in_client():
+    app_module = _import_app()
+    app = app_module.app
+    with app.app_context():
+        app_module.db.create_all()
+    client = app.test_client()
+    client.post('/signup', data={'username': 'bench', 'email': 'bench@example.com', 'password': 'bench'})
+    response = client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    # A successful login redirects to the menu, a failed one re-renders the form
+    if response.status_code != 302 or not response.location.endswith('/menu'):
+        raise RuntimeError(f'login failed (status {response.status_code})')
+    return client
+
+
+def _endpoint_analyze_face(motion):
+    def setup():
+        import io
+        import cv2
+        client = _logged_in_client()
+        images = [cv2.imencode('.jpg', frame)[1].tobytes()
+                  for frame in synthetic.face_frames(640, 480, motion=motion)]
+        counter = iter(range(10 ** 9))
+
+        def step():
+            # Bytes after the JPEG end marker are ignored by the decoder but
+            # make every upload unique, so the result cache doesn't answer
+            i = next(counter)
+            data = images[i % len(images)] + i.to_bytes(8, 'little')
+            response = client.post('/analyze_face', data={'image': (io.BytesIO(data), 'frame.jpg')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 200, response.status_code
+        return step
+    return setup
+
+
+benchmark('endpoint_analyze_face', iterations=50, quick=10)(_endpoint_analyze_face(True))
+benchmark('endpoint_analyze_face_still', iterations=50, quick=10)(_endpoint_analyze_face(False))
+
+
+@benchmark('endpoint_analyze_voice', iterations=5, quick=2)
+def endpoint_analyze_voice():
+    import io
+    client = _logged_in_client()
+    path = os.path.join(tempfile.mkdtemp(), 'speech.wav')
+    synthetic.write_wav(path, synthetic.speech_like_audio(10.0))
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    counter = iter(range(10 ** 9))
+
+    def step():
+        data[-1] = next(counter) % 256
+        response = client.post('/analyze_voice', data={'audio': (io.BytesIO(bytes(data)), 'speech.wav')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.status_code
+    return step
+
+
+@benchmark('endpoint_get_wellness_data', iterations=200, quick=30)
+def endpoint_get_wellness_data():
+    client = _logged_in_client()
+
+    def step():
+        response = client.get('/get_wellness_data')
+        assert response.status_code == 200, response.status_code
+    return step
+
+
+def run_one(name, quick, queue):
+    """Child process: set up, warm up, time the iterations"""
+    setup, iterations, quick_iterations = BENCHMARKS[name]
+    n = quick_iterations if quick else iterations
+    try:
+        step = setup()
+        step()  # warm-up
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(n):
+            t = time.perf_counter()
+            step()
+            latencies.append(time.perf_counter() - t)
+        total = time.perf_counter() - start
+    except Exception as e:
+        queue.put({'skipped': f'{type(e).__name__}: {e}'})
+        return
+    finally:
+        # Pool workers would otherwise keep this benchmark process alive
+        from utils import analysis_pool
+        analysis_pool.shutdown()
+
+    latencies = np.array(latencies) * 1000
+    queue.put({
+        'iterations': n,
+        'throughput_per_s': n / total,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    })
+
+
+def run(names, quick):
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in names:
+        queue = context.Queue()
+        process = context.Process(target=run_one, args=(name, quick, queue))
+        process.start()
+        process.join()
+        result = queue.get() if not queue.empty() else {'skipped': f'exit code {process.exitcode}'}
+        results[name] = result
+        if 'skipped' in result:
+            print(f"{name:32s} skipped ({result['skipped']})")
+        else:
+            print(f"{name:32s} {result['throughput_per_s']:9.1f}/s  p50 {result['p50_ms']:8.2f} ms  "
+                  f"p99 {result['p99_ms']:8.2f} ms  rss {result['peak_rss_mb']:7.1f} MB")
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print per-benchmark changes, return True if anything regressed
+
+    A benchmark that was skipped (failed) in the current run counts as a
+    regression.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    regressed = False
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name], current[name]
+        if 'skipped' in new:
+            print(f"{name:32s} skipped ({new['skipped']}) REGRESSION")
+            regressed = True
+            continue
+        if 'skipped' in old:
+            print(f"{name:32s} skipped in the baseline, nothing to compare")
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p99_ms', 'peak_rss_mb'):
+            change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            flag = ''
+            if change > threshold:
+                flag = ' REGRESSION'
+                regressed = True
+            changes.append(f"{metric} {old[metric]:.2f} -> {new[metric]:.2f} ({change:+.0%}){flag}")
+        print(f"{name:32s} " + ', '.join(changes))
+    return regressed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'compare':
+        parser = argparse.ArgumentParser(prog='benchmarks.run compare')
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help='relative slowdown reported as a regression (default 0.10)')
+        args = parser.parse_args(argv[1:])
+        sys.exit(1 if compare(args.baseline, args.current, args.threshold) else 0)
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=None, help='run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations')
+    parser.add_argument('--output', default=None, help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.only or args.only in name]
+    results = {'meta': metadata(), 'results': run(names, args.quick)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    # A benchmark that couldn't run measured nothing, fail the run
+    skipped = [name for name, result in results['results'].items() if 'skipped' in result]
+    if skipped:
+        print(f"{len(skipped)} benchmark(s) skipped: {', '.join(skipped)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
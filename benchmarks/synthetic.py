@@ -0,0 +1,90 @@
+import numpy as np
+
+def render_face(width=640, height=480, seed=0):
+    """Cartoon face on a noisy background, scaled to the frame size"""
+    import cv2
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 120, size=(height, width, 3), dtype=np.uint8)
+
+    cx, cy = width // 2, height // 2
+    face_h = int(height * 0.6)
+    face_w = int(face_h * 0.75)
+    cv2.ellipse(frame, (cx, cy), (face_w // 2, face_h // 2), 0, 0, 360, (150, 180, 220), -1)
+
+    eye_y = cy - face_h // 8
+    eye_dx = face_w // 5
+    eye_size = (max(2, face_w // 12), max(1, face_h // 28))
+    for side in (-1, 1):
+        eye_x = cx + side * eye_dx
+        cv2.ellipse(frame, (eye_x, eye_y), eye_size, 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(frame, (eye_x, eye_y), max(1, eye_size[1]), (40, 30, 30), -1)
+        brow_y = eye_y - face_h // 12
+        cv2.line(frame, (eye_x - eye_size[0], brow_y), (eye_x + eye_size[0], brow_y - side * 3),
+                 (40, 50, 70), max(1, face_h // 80))
+
+    cv2.line(frame, (cx, eye_y + face_h // 20), (cx, cy + face_h // 10), (120, 150, 190), max(1, face_h // 100))
+    cv2.ellipse(frame, (cx, cy + face_h // 5), (face_w // 5, face_h // 20), 0, 10, 170,
+                (60, 60, 160), max(1, face_h // 80))
+    return frame
+
+
+def face_frames(width=640, height=480, count=8, motion=True, seed=0):
+    """Consecutive webcam frames of render_face with sensor noise
+
+    With motion the face moves by a few pixels from frame to frame, so
+    every frame needs a full analysis. Without it only the noise changes,
+    like a user sitting still, and detections are mostly reused.
+    """
+    rng = np.random.default_rng(seed)
+    base = render_face(width, height).astype(np.int16)
+    frames = []
+    for i in range(count):
+        shift = (i % 4) * (width // 64) if motion else 0
+        noisy = np.roll(base, shift, axis=1) + rng.normal(0, 3, base.shape)
+        frames.append(np.clip(noisy, 0, 255).astype(np.uint8))
+    return frames
+
+
+def face_roi(width=640, height=480):
+    """Bounding box of the face drawn by render_face"""
+    face_h = int(height * 0.6)
+    face_w = int(face_h * 0.75)
+    return (width - face_w) // 2, (height - face_h) // 2, face_w, face_h
+
+
+def speech_like_audio(duration=10.0, sr=16000, pitch=150.0, jitter=0.02,
+                      silence_ratio=0.4, syllable_rate=4.0, seed=0):
+    """Voiced utterances separated by pauses, as float32 mono
+
+    The pitch wanders around `pitch` with the given relative cycle-to-cycle
+    jitter, the amplitude is modulated at `syllable_rate`, and roughly
+    `silence_ratio` of the clip is low-level noise.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    y = (1e-3 * rng.standard_normal(n)).astype(np.float32)
+
+    # Alternate speech and pause chunks of 0.5-1.5 s
+    position = 0
+    speaking = True
+    while position < n:
+        length = int(rng.uniform(0.5, 1.5) * sr)
+        if not speaking:
+            length = int(length * silence_ratio / max(1e-6, 1 - silence_ratio))
+        end = min(n, position + length)
+        if speaking and end > position:
+            t = np.arange(end - position) / sr
+            f0 = pitch * (1 + jitter * rng.standard_normal(len(t)).cumsum() / np.sqrt(sr))
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+            envelope = 0.5 * (1 - np.cos(2 * np.pi * syllable_rate * t))
+            y[position:end] += (0.2 * envelope * voice).astype(np.float32)
+        position = end
+        speaking = not speaking
+    return y
+
+
+def write_wav(path, y, sr=16000):
+    import soundfile as sf
+    sf.write(path, y, sr)
+    return path
@@ -1,23 +1,38 @@
 import pygame
-import random
+import numpy as np
 
 import os # Import the os module for path safety
 
+from utils.game_loop import GameClock, PerfOverlay
+
 # --- Initialization ---
 pygame.init()
 pygame.mixer.init()
 
 # Define screen dimensions and colors
 SCREEN_WIDTH = 800
-# ... (other dimension and color definitions) ...
+SCREEN_HEIGHT = 600
+SCREEN_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
+WHITE = (255, 255, 255)
+BLUE = (100, 150, 255)
 
-# --- NEW: Load Sound Effect ---
+# Grid of bubbles; raise the counts (and lower the radius) for bigger screens
+ROWS = int(os.environ.get('BUBBLE_ROWS', '6'))
+COLS = int(os.environ.get('BUBBLE_COLS', '10'))
+RADIUS = int(os.environ.get('BUBBLE_RADIUS', '30'))
+PADDING = int(os.environ.get('BUBBLE_PADDING', '20'))
+
+# Posted by a timer once all bubbles are popped
+REGENERATE_EVENT = pygame.USEREVENT + 1
+REGENERATE_DELAY_MS = 1000
+
+# --- Load Sound Effect ---
 # Check if the sound file exists before trying to load it
 sound_file_path = os.path.join(os.path.dirname(__file__), 'pop_sound.wav')
 if os.path.exists(sound_file_path):
     POP_SOUND = pygame.mixer.Sound(sound_file_path)
     # Adjust volume if needed (optional)
-    POP_SOUND.set_volume(0.5) 
+    POP_SOUND.set_volume(0.5)
     print("Pop sound loaded successfully.")
 else:
     # Use a dummy object if sound isn't found to prevent errors
@@ -27,135 +42,181 @@ else:
     POP_SOUND = DummySound()
     print("WARNING: 'pop_sound.wav' not found. Sound effect disabled.")
 
-
 # Setup the screen and title
-# ... (screen setup continues) ...
+screen = pygame.display.set_mode(SCREEN_SIZE)
+pygame.display.set_caption("Bubble Pop Relaxation")
 
-class Bubble:
-    def __init__(self, x, y, radius):
-        # ... (attributes remain the same) ...
-        pass # All attributes remain the same
-
-    # ... (draw method remains the same) ...
-
-    def check_pop(self, pos):
-        # Calculate distance between the click position and the bubble center
-        distance = ((self.x - pos[0])**2 + (self.y - pos[1])**2)**0.5
-        
-        if distance < self.radius and not self.is_popped:
-            self.is_popped = True
-            
-            # --- NEW: Play Sound Here ---
-            global POP_SOUND
-            POP_SOUND.play() # Plays the loaded sound file
-            # ---------------------------
-            
-            return True
-        return False
+# Game clock: nothing animates, so the loop sleeps until input or a timer
+game_clock = GameClock()
+overlay = PerfOverlay()
 
-# Define screen dimensions and colors
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-SCREEN_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
-WHITE = (255, 255, 255)
-BLUE = (100, 150, 255)
 
-# Setup the screen and title
-screen = pygame.display.set_mode(SCREEN_SIZE)
-pygame.display.set_caption("Bubble Pop Relaxation")
+def render_bubble_sprite(radius):
+    """Draw a bubble once; every bubble of this radius is blitted from it"""
+    sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+    # Draw the main circle
+    pygame.draw.circle(sprite, BLUE, (radius, radius), radius)
+    # Draw a light highlight for a 3D effect
+    pygame.draw.circle(sprite, WHITE, (radius - radius // 3, radius - radius // 3), radius // 3, 1)
+    return sprite
+
 
-# Game clock
-clock = pygame.time.Clock()
+class BubbleField:
+    """All bubbles as NumPy arrays plus a uniform grid for hit-testing
+
+    Grid cells are as wide as the largest bubble, so a click can only hit
+    bubbles whose centers lie in the clicked cell or its 8 neighbours.
+    """
 
-class Bubble:
     def __init__(self, x, y, radius):
-        self.x = x
-        self.y = y
-        self.radius = radius
-        self.color = BLUE
-        self.is_popped = False
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.radius = np.asarray(radius, dtype=np.int32)
+        self.popped = np.zeros(len(self.x), dtype=bool)
+        self.popped_count = 0
+        self.sprites = {int(r): render_bubble_sprite(int(r)) for r in np.unique(self.radius)}
+
+        # Bucket bubbles by cell: cell_order lists bubble indices sorted by
+        # cell, cell_start[c]:cell_start[c + 1] is the slice for cell c
+        self.cell_size = max(2 * int(self.radius.max()), 1) if len(self.x) else 1
+        self.grid_cols = SCREEN_WIDTH // self.cell_size + 1
+        self.grid_rows = SCREEN_HEIGHT // self.cell_size + 1
+        cells = self._cell_index(self.x // self.cell_size, self.y // self.cell_size)
+        self.cell_order = np.argsort(cells, kind='stable')
+        self.cell_start = np.searchsorted(cells[self.cell_order], np.arange(self.grid_rows * self.grid_cols + 1))
+
+    def __len__(self):
+        return len(self.x)
+
+    def _cell_index(self, col, row):
+        col = np.clip(col, 0, self.grid_cols - 1)
+        row = np.clip(row, 0, self.grid_rows - 1)
+        return row * self.grid_cols + col
+
+    def rect(self, i):
+        r = int(self.radius[i])
+        return pygame.Rect(int(self.x[i]) - r, int(self.y[i]) - r, 2 * r + 1, 2 * r + 1)
+
+    def _unpopped_near(self, x, y):
+        """Unpopped bubbles with centers in the cell of (x, y) or its neighbours"""
+        col, row = x // self.cell_size, y // self.cell_size
+        candidates = []
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                if 0 <= col + d_col < self.grid_cols and 0 <= row + d_row < self.grid_rows:
+                    cell = (row + d_row) * self.grid_cols + col + d_col
+                    candidates.append(self.cell_order[self.cell_start[cell]:self.cell_start[cell + 1]])
+        candidates = np.concatenate(candidates)
+        return candidates[~self.popped[candidates]]
+
+    def hit(self, pos):
+        """Index of the unpopped bubble under pos, or None"""
+        candidates = self._unpopped_near(*pos)
+        if len(candidates) == 0:
+            return None
+        dx = self.x[candidates] - pos[0]
+        dy = self.y[candidates] - pos[1]
+        inside = dx * dx + dy * dy < self.radius[candidates] ** 2
+        return int(candidates[inside][0]) if inside.any() else None
+
+    def pop(self, i):
+        self.popped[i] = True
+        self.popped_count += 1
+        POP_SOUND.play()
+
+    def _blit_clipped(self, surface, candidates, rect):
+        for j in candidates:
+            bubble = self.rect(j)
+            if bubble.colliderect(rect):
+                area = rect.clip(bubble)
+                surface.blit(self.sprites[int(self.radius[j])], area, area.move(-bubble.x, -bubble.y))
+
+    def erase(self, surface, i):
+        """Clear a popped bubble and return the screen rect that changed"""
+        rect = self.rect(i)
+        surface.fill(WHITE, rect)
+        # Restore any overlapping neighbours the fill cut into
+        self._blit_clipped(surface, self._unpopped_near(int(self.x[i]), int(self.y[i])), rect)
+        return rect
+
+    def repaint(self, surface, rect):
+        """Redraw background and bubbles inside an arbitrary screen rect"""
+        surface.fill(WHITE, rect)
+        inside = (~self.popped & (self.x + self.radius >= rect.left) & (self.x - self.radius < rect.right)
+                  & (self.y + self.radius >= rect.top) & (self.y - self.radius < rect.bottom))
+        self._blit_clipped(surface, np.flatnonzero(inside), rect)
+
+    def all_popped(self):
+        return self.popped_count == len(self)
 
     def draw(self, surface):
-        if not self.is_popped:
-            # Draw the main circle
-            pygame.draw.circle(surface, self.color, (self.x, self.y), self.radius)
-            # Draw a light highlight for a 3D effect
-            pygame.draw.circle(surface, WHITE, (self.x - self.radius // 3, self.y - self.radius // 3), 
-                               self.radius // 3, 1)
-
-    def check_pop(self, pos):
-        # Calculate distance between the click position and the bubble center
-        distance = ((self.x - pos[0])**2 + (self.y - pos[1])**2)**0.5
-        
-        if distance < self.radius and not self.is_popped:
-            self.is_popped = True
-            global POP_SOUND
-            POP_SOUND.play()
-            return True
-        return False
+        """Blit every unpopped bubble, for a full redraw"""
+        surface.blits([(self.sprites[int(self.radius[i])], self.rect(i)) for i in np.flatnonzero(~self.popped)],
+                      doreturn=False)
+
 
 def create_bubble_grid():
-    bubbles = []
-    # Grid parameters
-    rows = 6
-    cols = 10
-    padding = 20
-    radius = 30
-    
     # Calculate starting position for centering
-    start_x = (SCREEN_WIDTH - (cols * (radius * 2 + padding) - padding)) // 2
-    start_y = (SCREEN_HEIGHT - (rows * (radius * 2 + padding) - padding)) // 2
+    start_x = (SCREEN_WIDTH - (COLS * (RADIUS * 2 + PADDING) - PADDING)) // 2
+    start_y = (SCREEN_HEIGHT - (ROWS * (RADIUS * 2 + PADDING) - PADDING)) // 2
+
+    rows, cols = np.divmod(np.arange(ROWS * COLS), COLS)
+    x = start_x + cols * (2 * RADIUS + PADDING) + RADIUS
+    y = start_y + rows * (2 * RADIUS + PADDING) + RADIUS
+    return BubbleField(x, y, np.full(len(x), RADIUS))
+
+
+def redraw_all(surface, bubbles):
+    surface.fill(WHITE) # Background color
+    bubbles.draw(surface)
+    pygame.display.flip()
 
-    for r in range(rows):
-        for c in range(cols):
-            x = start_x + c * (2 * radius + padding) + radius
-            y = start_y + r * (2 * radius + padding) + radius
-            bubbles.append(Bubble(x, y, radius))
-            
-    return bubbles
 
 all_bubbles = create_bubble_grid()
+redraw_all(screen, all_bubbles)
+regenerating = False
 
 # --- Main Game Loop ---
 running = True
 while running:
+    # Screen areas changed this frame; only these are sent to the display
+    dirty_rects = []
+    overlay_toggled = False
+
     # 1. Event Handling
-    for event in pygame.event.get():
+    for event in game_clock.events(animating=False, wake_after_ms=overlay.wake_after_ms):
         if event.type == pygame.QUIT:
             running = False
-        
+
+        elif overlay.handle(event):
+            overlay_toggled = True
+
+        # New grid once the regeneration timer fires
+        elif event.type == REGENERATE_EVENT:
+            all_bubbles = create_bubble_grid()
+            redraw_all(screen, all_bubbles)
+            regenerating = False
+            overlay_toggled = overlay.visible
+
         # Handle Mouse Clicks
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:  # Left click
-                mouse_pos = pygame.mouse.get_pos()
-                
-                for bubble in all_bubbles:
-                    if bubble.check_pop(mouse_pos):
-                        # Play a pop sound (requires a sound file)
-                        # Optional: Add a subtle text message like "Pop!"
-                        pass 
-
-    # 2. Drawing (Render)
-    screen.fill(WHITE) # Background color
-
-    # Draw all bubbles
-    popped_count = 0
-    for bubble in all_bubbles:
-        bubble.draw(screen)
-        if bubble.is_popped:
-            popped_count += 1
-            
-    # Check if all bubbles are popped (and regenerate)
-    if popped_count == len(all_bubbles):
-        # Simple regeneration after a 1-second delay
-        pygame.time.wait(1000) 
-        all_bubbles = create_bubble_grid()
-        
-    # Update the full screen display
-    pygame.display.flip()
-
-    # Limit frame rate
-    clock.tick(60)
+                hit = all_bubbles.hit(event.pos)
+                if hit is not None:
+                    all_bubbles.pop(hit)
+                    dirty_rects.append(all_bubbles.erase(screen, hit))
+
+    # 2. Drawing (Render) - only what changed
+    if overlay.frame() or overlay_toggled or (dirty_rects and overlay.visible):
+        dirty_rects += overlay.draw(screen, lambda rect: all_bubbles.repaint(screen, rect))
+    if dirty_rects:
+        pygame.display.update(dirty_rects)
+
+    # Check if all bubbles are popped (and regenerate after a 1-second
+    # delay, without blocking the loop)
+    if all_bubbles.all_popped() and not regenerating:
+        pygame.time.set_timer(REGENERATE_EVENT, REGENERATE_DELAY_MS, loops=1)
+        regenerating = True
 
 # Quit Pygame
-pygame.quit()
\ No newline at end of file
+pygame.quit()
@@ -0,0 +1,44 @@
+# Gunicorn settings for production serving:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# A few threaded web workers handle login, pages and polling; CPU-bound
+# face/voice analysis is handed to a process pool in each web worker (see
+# utils/analysis_pool.py), sized so that all cores are used without
+# oversubscribing them. Every setting can be overridden with an env var.
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+bind = os.environ.get('WELLNESS_BIND', '0.0.0.0:8000')
+
+# Web workers: requests are mostly I/O bound once analysis is offloaded
+workers = int(os.environ.get('WELLNESS_WEB_WORKERS', max(1, min(4, cores // 4))))
+worker_class = 'gthread'
+threads = int(os.environ.get('WELLNESS_WEB_THREADS', '16'))
+
+# Analysis processes per web worker, so that all of them together use every core
+os.environ.setdefault('WELLNESS_ANALYSIS_PROCESSES', str(max(1, cores // workers)))
+
+# Import the app (and warm up, if WELLNESS_WARMUP=1) once in the master
+preload_app = True
+
+# Recycle web workers to cap memory growth; jitter avoids restarting all at once
+max_requests = int(os.environ.get('WELLNESS_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+# Voice clips can take a while to analyze
+timeout = int(os.environ.get('WELLNESS_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+
+
+def worker_exit(server, worker):
+    # Recycled workers (max_requests) must not drop open sessions
+    from app import flush_sessions
+    from utils import analysis_pool
+    flush_sessions()
+    analysis_pool.shutdown()
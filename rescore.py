@@ -0,0 +1,347 @@
+"""Recompute wellness scores for stored data after analyzer changes.
+
+Two modes:
+
+  media    Walk a directory of recorded media laid out as
+           <root>/<user_id>/<file>, re-run FaceAnalyzer (images),
+           VideoAnalyzer (recordings) and VoiceAnalyzer (audio) in a
+           process pool and merge the results into the sample store,
+           keyed by user, sample time and source.
+
+  history  Recompute the wellness index of every stored sample from its
+           stress/fatigue scores. Use this after changing the scoring
+           weights; the raw media isn't needed.
+
+Both modes then rebuild the session_summary rows of the affected users
+from the sample store. Stored sessions keep their time range; samples
+outside all of them are grouped into new sessions, split at gaps longer
+than the session idle timeout.
+
+Both modes write a checkpoint file after every committed chunk, so an
+interrupted run picks up where it stopped when started again. The
+checkpoint is removed when a run completes, so the next run (e.g. after
+another weights change) starts over.
+
+Examples:
+  python rescore.py media recordings/ --workers 8
+  python rescore.py history --database-url sqlite:///instance/wellness.db --sample-dir instance/samples
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+from sqlalchemy import MetaData, Table, bindparam, create_engine, select
+
+from utils.sample_store import SOURCES, SampleStore, from_millis, to_millis
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+AUDIO_EXTENSIONS = {'.wav', '.flac', '.ogg', '.mp3', '.m4a'}
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mkv', '.avi', '.mov'}
+
+DEFAULT_DATABASE_URL = 'sqlite:///instance/wellness.db'
+DEFAULT_SAMPLE_DIR = os.path.join('instance', 'samples')
+
+# Per-process analyzers, built once by the pool initializer
+_face_analyzer = None
+_voice_analyzer = None
+_video_analyzer = None
+
+
+def init_worker(config):
+    """Build the analyzers once per worker process"""
+    global _face_analyzer, _voice_analyzer, _video_analyzer
+    from utils.face_analyzer import FaceAnalyzer
+    from utils.video_analyzer import VideoAnalyzer
+    from utils.voice_analyzer import VoiceAnalyzer
+
+    # Images are independent, analyze each in full
+    _face_analyzer = FaceAnalyzer(change_threshold=None)
+    _video_analyzer = VideoAnalyzer(target_fps=config.get('video_fps', 1.0))
+    _voice_analyzer = VoiceAnalyzer()
+    _voice_analyzer.stress_thresholds.update(config.get('stress_thresholds', {}))
+    _voice_analyzer.fatigue_thresholds.update(config.get('fatigue_thresholds', {}))
+
+
+def score_row(results, timestamp, source):
+    return {
+        'timestamp': timestamp,
+        'source': source,
+        'stress_level': float(results['stress_score']),
+        'fatigue_level': float(results['fatigue_score']),
+        'wellness_index': float(results['wellness_index']),
+    }
+
+
+def analyze_file(path):
+    """Run the matching analyzer on one file, returning its sample rows"""
+    extension = os.path.splitext(path)[1].lower()
+    modified = datetime.utcfromtimestamp(os.path.getmtime(path))
+    if extension in IMAGE_EXTENSIONS:
+        import cv2
+        frame = cv2.imread(path)
+        if frame is None:
+            return []
+        # Images are unrelated, don't carry blink/eye strain state over
+        _face_analyzer.reset()
+        results = _face_analyzer.analyze(frame)
+        if not results['face_detected']:
+            return []
+        return [score_row(results, modified, 'face')]
+    if extension in VIDEO_EXTENSIONS:
+        return [dict(row, source='face') for row in _video_analyzer.analyze_video(path)['samples']]
+    if extension in AUDIO_EXTENSIONS:
+        results = _voice_analyzer.analyze_audio(path)
+        if 'error' in results:
+            return []
+        return [score_row(results, modified, 'voice')]
+    return []
+
+
+def process_chunk(chunk):
+    """Analyze a chunk of (path, user_id) work units in a worker process"""
+    results = []
+    for path, user_id in chunk:
+        try:
+            rows = analyze_file(path)
+        except Exception as e:
+            print(f"Error analyzing {path}: {e}", file=sys.stderr)
+            rows = []
+        results.append({'path': path, 'rows': [dict(row, user_id=user_id) for row in rows]})
+    return results
+
+
+def find_media(root):
+    """Yield (path, user_id) for every analyzable file under root"""
+    extensions = IMAGE_EXTENSIONS | AUDIO_EXTENSIONS | VIDEO_EXTENSIONS
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if not entry.is_dir() or not entry.name.isdigit():
+            continue
+        user_id = int(entry.name)
+        for dirpath, _, filenames in os.walk(entry.path):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    yield os.path.join(dirpath, filename), user_id
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_checkpoint(path):
+    """Work units already done: media files, sample partitions and users
+    whose sessions were rebuilt"""
+    done = set()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.update(json.loads(line).get('done', []))
+    return done
+
+
+def write_checkpoint(path, entry):
+    if not path:
+        return
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def session_table(engine):
+    return Table('session_summary', MetaData(), autoload_with=engine)
+
+
+def rows_to_samples(rows):
+    """Analyzer rows as sample store columns"""
+    return {
+        'timestamp': np.array([to_millis(row['timestamp']) for row in rows], dtype=np.int64),
+        'stress': np.array([row['stress_level'] for row in rows], dtype=np.float32),
+        'fatigue': np.array([row['fatigue_level'] for row in rows], dtype=np.float32),
+        'wellness': np.array([row['wellness_index'] for row in rows], dtype=np.float32),
+        'source': np.array([SOURCES.index(row['source']) for row in rows], dtype=np.uint8),
+    }
+
+
+def rebuild_sessions(engine, table, store, user_id, idle_timeout, detail_seconds, modality=None):
+    """Re-aggregate a user's session summaries from the sample store
+
+    Returns the number of updated and inserted sessions. Stored sessions
+    without any samples are left as they are. modality overrides the
+    weight profile of the overall scores.
+    """
+    from utils.session_aggregator import WellnessSession, summary_row
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(table.c.id, table.c.started_at, table.c.ended_at)
+                              .where(table.c.user_id == user_id)
+                              .order_by(table.c.started_at)).fetchall()
+    starts = np.array([to_millis(row.started_at) for row in stored], dtype=np.int64)
+    ends = np.array([to_millis(row.ended_at) for row in stored], dtype=np.int64)
+
+    rebuilt = {}  # stored row index -> WellnessSession
+    new_sessions = []
+    current = None  # new session being grouped
+    for day in store.days(user_id):
+        samples = store.read_day(user_id, day)
+        covering = np.searchsorted(starts, samples['timestamp'], 'right') - 1
+        for millis, index, stress, fatigue, wellness, source in zip(
+                samples['timestamp'], covering, samples['stress'], samples['fatigue'],
+                samples['wellness'], samples['source']):
+            result = {'stress_score': stress, 'fatigue_score': fatigue, 'wellness_index': wellness}
+            timestamp = from_millis(millis)
+            if index >= 0 and millis <= ends[index]:
+                session = rebuilt.get(index)
+                if session is None:
+                    session = rebuilt[index] = WellnessSession(user_id, stored[index].started_at,
+                                                               detail_seconds, modality)
+                current = None
+            else:
+                if current is None or (timestamp - current.last_seen).total_seconds() > idle_timeout:
+                    current = WellnessSession(user_id, timestamp, detail_seconds, modality)
+                    new_sessions.append(current)
+                session = current
+            session.ingest(SOURCES[source], result, timestamp)
+
+    updates = [dict(summary_row(session.close(stored[index].ended_at)), row_id=stored[index].id)
+               for index, session in rebuilt.items()]
+    inserts = [summary_row(session.close()) for session in new_sessions]
+    with engine.begin() as conn:
+        if updates:
+            conn.execute(table.update().where(table.c.id == bindparam('row_id')), updates)
+        if inserts:
+            conn.execute(table.insert(), inserts)
+    return len(updates), len(inserts)
+
+
+def rebuild_all_sessions(args, engine, store, user_ids, done):
+    table = session_table(engine)
+    for user_id in user_ids:
+        key = f'sessions:{user_id}'
+        if key in done:
+            continue
+        updated, inserted = rebuild_sessions(engine, table, store, user_id, args.session_idle,
+                                             args.session_detail, getattr(args, 'modality', None))
+        write_checkpoint(args.checkpoint, {'done': [key]})
+        print(f"user {user_id}: {updated} sessions updated, {inserted} inserted")
+
+
+def load_config(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def rescore_media(args):
+    engine = create_engine(args.database_url)
+    store = SampleStore(args.sample_dir)
+    done = load_checkpoint(args.checkpoint)
+
+    media = list(find_media(args.root))
+    work = [item for item in media if f'file:{item[0]}' not in done]
+    print(f"{len(work)} files to analyze ({len(media) - len(work)} already done)")
+
+    start = time.time()
+    processed = replaced = inserted = skipped = 0
+    if work:
+        with Pool(args.workers, initializer=init_worker, initargs=(load_config(args.config),)) as pool:
+            for results in pool.imap_unordered(process_chunk, chunked(work, args.chunk_size)):
+                rows = [row for r in results for row in r['rows']]
+                for user_id in sorted({row['user_id'] for row in rows}):
+                    n_replaced, n_inserted = store.merge(
+                        user_id, rows_to_samples([row for row in rows if row['user_id'] == user_id]))
+                    replaced += n_replaced
+                    inserted += n_inserted
+                write_checkpoint(args.checkpoint, {'done': [f"file:{r['path']}" for r in results]})
+
+                processed += len(results)
+                skipped += sum(1 for r in results if not r['rows'])
+                rate = processed / (time.time() - start)
+                print(f"{processed}/{len(work)} files ({rate:.1f}/s), "
+                      f"{replaced} samples replaced, {inserted} inserted, {skipped} files skipped")
+
+    rebuild_all_sessions(args, engine, store, sorted({user_id for _, user_id in media}), done)
+
+
+def rescore_history(args):
+    from utils.wellness_scoring import wellness_index
+
+    engine = create_engine(args.database_url)
+    store = SampleStore(args.sample_dir)
+    done = load_checkpoint(args.checkpoint)
+
+    def rescore(samples):
+        # Each sample is scored with the weights of its source, unless overridden
+        for index, source in enumerate(SOURCES):
+            mask = samples['source'] == index
+            if mask.any():
+                samples['wellness'][mask] = wellness_index(samples['stress'][mask], samples['fatigue'][mask],
+                                                           args.modality or source)
+        return samples
+
+    total = 0
+    for user_id in store.users():
+        for day in store.days(user_id):
+            key = f'samples:{user_id}/{day}'
+            if key in done:
+                continue
+            store.update_day(user_id, day, rescore)
+            write_checkpoint(args.checkpoint, {'done': [key]})
+            total += 1
+            print(f"{total} partitions rescored (user {user_id}, {day})")
+
+    rebuild_all_sessions(args, engine, store, store.users(), done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--sample-dir', default=os.environ.get('WELLNESS_SAMPLE_DIR', DEFAULT_SAMPLE_DIR))
+    parser.add_argument('--session-idle', type=float,
+                        default=float(os.environ.get('WELLNESS_SESSION_IDLE_SECONDS', '300')),
+                        help='gap (seconds) that splits samples outside stored sessions')
+    parser.add_argument('--session-detail', type=int,
+                        default=int(os.environ.get('WELLNESS_SESSION_DETAIL_SECONDS', '60')),
+                        help='seconds per session timeline entry')
+    parser.add_argument('--checkpoint', default=None,
+                        help='checkpoint file for resuming (default: rescore_<mode>.checkpoint)')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    media = subparsers.add_parser('media', help='re-run the analyzers on recorded media')
+    media.add_argument('root', help='directory with one sub-directory per user id')
+    media.add_argument('--workers', type=int, default=os.cpu_count())
+    media.add_argument('--chunk-size', type=int, default=32,
+                       help='files per work unit and per database commit')
+    media.add_argument('--config', default=None,
+                       help='JSON file with stress_thresholds/fatigue_thresholds/video_fps overrides')
+
+    history = subparsers.add_parser('history', help='recompute wellness indexes from stored scores')
+    history.add_argument('--modality', default=None,
+                         help='weight profile from utils.wellness_scoring.MODALITY_WEIGHTS '
+                              '(default: the profile of each sample\'s source)')
+
+    args = parser.parse_args(argv)
+    if args.checkpoint is None:
+        args.checkpoint = f'rescore_{args.mode}.checkpoint'
+
+    if args.mode == 'media':
+        rescore_media(args)
+    else:
+        rescore_history(args)
+
+    # Everything is done, a later run must not skip it all again
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
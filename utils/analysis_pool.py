@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.analyzers import get_face_analyzer, get_voice_analyzer, warm_up
+from utils.profiling import metrics, replay
+
+# CV/audio analysis is CPU bound and holds the GIL, so in production it runs
+# in worker processes while the web threads only handle I/O.
+# WELLNESS_ANALYSIS_PROCESSES=0 (the default) analyzes in the request thread.
+#
+# Every process is its own single-worker executor and a web worker always
+# sends a user to the same one, so the face analyzer's per-user state
+# (blinks, eye strain, reused detections) builds up in one place instead of
+# being scattered over all of them. Requests of one user that land on
+# different gunicorn web workers still go to different pools.
+_executors = []
+_executors_pid = None
+_lock = threading.Lock()
+
+
+class AnalysisUnavailable(Exception):
+    """The analysis process timed out or died; the request can be retried"""
+
+
+def configured_processes():
+    return int(os.environ.get('WELLNESS_ANALYSIS_PROCESSES', '0'))
+
+
+def enabled():
+    return configured_processes() > 0
+
+
+def _init_worker():
+    # Build the analyzers and compile librosa's numba code once per process
+    warm_up()
+
+
+def _new_executor():
+    # forkserver: children fork from a clean server process that has
+    # already imported cv2/numpy/librosa, sharing those pages
+    context = multiprocessing.get_context('forkserver' if sys.platform != 'win32' else 'spawn')
+    if sys.platform != 'win32':
+        context.set_forkserver_preload(['numpy', 'cv2', 'librosa', 'utils.face_analyzer',
+                                        'utils.voice_analyzer'])
+    kwargs = {}
+    if sys.version_info >= (3, 11):
+        # Recycle workers to cap memory growth from librosa/numba caches
+        kwargs['max_tasks_per_child'] = int(os.environ.get('WELLNESS_ANALYSIS_MAX_TASKS', '500'))
+    return ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker, **kwargs)
+
+
+def get_pool(key=0):
+    """The analysis process for key (e.g. a user id), created on first use after fork"""
+    global _executors, _executors_pid
+    with _lock:
+        if _executors_pid != os.getpid():
+            _executors = [None] * configured_processes()
+            _executors_pid = os.getpid()
+        index = hash(key) % len(_executors)
+        if _executors[index] is None:
+            _executors[index] = _new_executor()
+        return _executors[index]
+
+
+def _discard(executor):
+    """Drop a broken executor, the next task for its users starts a new one"""
+    with _lock:
+        if _executors_pid == os.getpid() and executor in _executors:
+            _executors[_executors.index(executor)] = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _recorded(function, *args):
+    # This process's metrics are never scraped, send them back with the result
+    with metrics.recording() as records:
+        result = function(*args)
+    return result, records
+
+
+def _submit(key, timeout, function, *args):
+    executor = get_pool(key)
+    try:
+        future = executor.submit(_recorded, function, *args)
+        result, records = future.result(timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise AnalysisUnavailable(f'analysis took longer than {timeout} s') from None
+    except BrokenProcessPool:
+        # The process died (crash, OOM kill); replace it rather than
+        # failing every later request of the same users
+        _discard(executor)
+        raise AnalysisUnavailable('the analysis process died') from None
+    replay(records)
+    return result
+
+
+def _analyze_face_bytes(data, user_id=None):
+    import cv2
+    import numpy as np
+    from utils.profiling import timed_stage
+    with timed_stage('face.decode'):
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return {'error': 'Could not decode image', 'face_detected': False}
+    return get_face_analyzer().analyze(img, stream=user_id)
+
+
+def _analyze_voice_file(path):
+    return get_voice_analyzer().analyze_audio(path)
+
+
+def analyze_face(data, user_id=None, timeout=30):
+    """Decode and analyze an uploaded image, in the user's pool process when enabled"""
+    if enabled():
+        return _submit(user_id, timeout, _analyze_face_bytes, data, user_id)
+    return _analyze_face_bytes(data, user_id)
+
+
+def analyze_voice(path, user_id=None, timeout=120):
+    """Analyze an audio file, in the user's pool process when enabled"""
+    if enabled():
+        return _submit(user_id, timeout, _analyze_voice_file, path)
+    return _analyze_voice_file(path)
+
+
+def shutdown():
+    global _executors, _executors_pid
+    with _lock:
+        executors = _executors if _executors_pid == os.getpid() else []
+        _executors, _executors_pid = [], None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
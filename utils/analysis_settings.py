@@ -0,0 +1,52 @@
+import hashlib
+import json
+
+# Settings that change analysis results, and the limits checked before
+# analysis. Importing this module is cheap (no cv2, numpy or librosa), so
+# web processes can key the result cache and reject oversized uploads
+# without building the analyzers; the analyzers take their defaults here.
+
+# Expression features: every face is resized to a chip_size square chip,
+# split into cell_size cells with n_bins orientation bins each
+CHIP_SIZE = 96
+CELL_SIZE = 16
+N_BINS = 9
+
+# Voice analysis
+SAMPLE_RATE = 16000  # Hz
+MAX_AUDIO_SECONDS = 60.0  # longer recordings are truncated
+MAX_AUDIO_UPLOAD_BYTES = 10 * 1024 * 1024
+
+STRESS_THRESHOLDS = {
+    'pitch_range': (100, 300),  # Hz
+    'jitter_threshold': 0.04,   # 4%
+    'shimmer_threshold': 0.15,  # 15%
+    'hfd_threshold': 2.5        # Higher order spectral feature
+}
+
+FATIGUE_THRESHOLDS = {
+    'speech_rate': (3, 5),      # Syllables per second
+    'pause_ratio': 0.2,         # 20% of speech is pauses
+    'h1_h2': 12.0,              # Glottal source feature
+    'cpcs': 0.6                 # Cepstral peak prominence (smoothed)
+}
+
+
+def settings_version(*settings):
+    """Short hash of the settings that affect analysis results"""
+    return hashlib.md5(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:8]
+
+
+def face_config_version():
+    """FaceAnalyzer().config_version(), without building the analyzer"""
+    return settings_version(CHIP_SIZE, CELL_SIZE, N_BINS)
+
+
+def voice_config_version():
+    """VoiceAnalyzer().config_version(), without building the analyzer"""
+    return settings_version(SAMPLE_RATE, STRESS_THRESHOLDS, FATIGUE_THRESHOLDS)
+
+
+def accepts_audio_upload(n_bytes):
+    """Whether an audio upload of n_bytes is small enough to decode"""
+    return n_bytes is not None and n_bytes <= MAX_AUDIO_UPLOAD_BYTES
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+# Shared analyzer instances, created on first use. Importing this module is
+# cheap - cv2, numpy and librosa are only imported when an analyzer is built.
+_analyzers = {}
+_lock = threading.Lock()
+
+# Seconds spent in each startup step, see startup_report()
+_timings = {}
+_started = time.perf_counter()
+
+
+def record_timing(step, seconds):
+    _timings[step] = round(seconds, 4)
+
+
+def _get(name, factory):
+    analyzer = _analyzers.get(name)
+    if analyzer is not None:
+        return analyzer
+    with _lock:
+        analyzer = _analyzers.get(name)
+        if analyzer is None:
+            start = time.perf_counter()
+            analyzer = factory()
+            record_timing(f'{name}_init', time.perf_counter() - start)
+            _analyzers[name] = analyzer
+    return analyzer
+
+
+def _make_face_analyzer():
+    from utils.face_analyzer import FaceAnalyzer
+    # Max gray-level change for a frame to reuse the last detections, 0 disables
+    threshold = os.environ.get('WELLNESS_FRAME_CHANGE_THRESHOLD')
+    if threshold is None:
+        return FaceAnalyzer()
+    return FaceAnalyzer(change_threshold=float(threshold))
+
+
+def _make_voice_analyzer():
+    from utils.voice_analyzer import VoiceAnalyzer
+    return VoiceAnalyzer()
+
+
+def get_face_analyzer():
+    """Shared FaceAnalyzer, imports cv2 and loads the cascades on first call"""
+    return _get('face_analyzer', _make_face_analyzer)
+
+
+def get_voice_analyzer():
+    """Shared VoiceAnalyzer, imports librosa on first call"""
+    return _get('voice_analyzer', _make_voice_analyzer)
+
+
+def warm_up(face=True, voice=True):
+    """Build the analyzers and run them once on synthetic input
+
+    librosa's pyin, stft and onset code is compiled by numba on first call,
+    which takes seconds. Call this at worker start so the first real request
+    doesn't pay for it.
+    """
+    start = time.perf_counter()
+
+    if face:
+        import numpy as np
+        analyzer = get_face_analyzer()
+        step = time.perf_counter()
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        analyzer.analyze(frame)
+        analyzer.analyze_facial_expressions(frame, (80, 40, 160, 160))
+        record_timing('face_warmup', time.perf_counter() - step)
+
+    if voice:
+        import numpy as np
+        analyzer = get_voice_analyzer()
+        step = time.perf_counter()
+        # One second of a 150 Hz tone with a short pause, over low-level
+        # noise so the VAD has a background to find the tone against
+        t = np.arange(analyzer.sample_rate, dtype=np.float32) / analyzer.sample_rate
+        y = (0.3 * np.sin(2 * np.pi * 150 * t)).astype(np.float32)
+        y[len(y) // 2:len(y) // 2 + 1600] = 0
+        y += 0.001 * np.random.default_rng(0).standard_normal(len(y)).astype(np.float32)
+        analyzer.extract_features(y)
+        record_timing('voice_warmup', time.perf_counter() - step)
+
+    record_timing('warm_up', time.perf_counter() - start)
+
+
+def startup_report():
+    """Startup step timings in seconds, plus which analyzers are loaded"""
+    return {
+        'uptime': round(time.perf_counter() - _started, 4),
+        'timings': dict(_timings),
+        'loaded': sorted(_analyzers)
+    }
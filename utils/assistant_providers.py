@@ -0,0 +1,513 @@
+import os
+import queue
+import re
+import threading
+import time
+
+from utils.hospital_index import HospitalIndex
+from utils.result_cache import ResultCache
+
+# Seconds any single network call of the assistant may take
+DEFAULT_TIMEOUT = float(os.environ.get('ASSISTANT_TIMEOUT', '8'))
+
+ADVICE_PROMPT = """
+You are a smart medical assistant specialized in fatigue and stress management.
+The user said: {user_input}.
+1. Identify if the user describes fatigue, stress, or another issue.
+2. Give home treatment and relaxation tips.
+3. If severe, advise visiting nearby hospitals.
+4. Keep your response empathetic, short, and medically safe.
+"""
+
+
+class ProviderError(Exception):
+    """A provider could not produce a result (no network, timeout, missing key)"""
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace for cache keys"""
+    return ' '.join(re.sub(r"[^\w\s']", ' ', text.lower()).split())
+
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def split_sentences(text):
+    """Complete sentences in text, and the unfinished remainder"""
+    parts = _SENTENCE_END.split(text)
+    return [part.strip() for part in parts[:-1] if part.strip()], parts[-1]
+
+
+def location_key(lat, lon, precision=2):
+    # Two decimals is roughly 1 km, close enough for a nearby-hospital list
+    return f'{round(float(lat), precision)},{round(float(lon), precision)}'
+
+
+# --- Advice ---
+
+class TemplateAdviceProvider:
+    """Offline advice from keyword matching and canned tips"""
+
+    name = 'template'
+
+    KEYWORDS = {
+        'fatigue': ('tired', 'fatigue', 'exhausted', 'sleepy', 'drowsy', 'no energy', 'worn out',
+                    'weak', 'sleep', 'insomnia'),
+        'stress': ('stress', 'anxious', 'anxiety', 'overwhelmed', 'tense', 'worried', 'panic',
+                   'pressure', 'nervous', 'burnout', 'burned out', 'burnt out'),
+    }
+    SEVERE = ('chest pain', 'faint', 'passed out', "can't breathe", 'cannot breathe',
+              'shortness of breath', 'severe', 'emergency', 'bleeding', 'suicid', 'self harm')
+
+    TIPS = {
+        'fatigue': [
+            'Aim for 7-9 hours of sleep at regular times and keep screens out of the last hour before bed.',
+            'Drink water regularly and eat small, balanced meals instead of relying on caffeine or sugar.',
+            'Take a 5-minute break every hour to stand, stretch and rest your eyes on something distant.',
+        ],
+        'stress': [
+            'Try slow breathing: in for 4 seconds, hold for 4, out for 6, for a couple of minutes.',
+            'Break your work into small steps and focus on one at a time.',
+            'A short walk, some light exercise or talking to someone you trust can ease tension.',
+        ],
+        'other': [
+            'Rest, stay hydrated and keep track of when your symptoms occur.',
+            'If things do not improve within a few days, please check in with a doctor.',
+        ],
+    }
+
+    def classify(self, text):
+        text = normalize_text(text)
+        conditions = [condition for condition, words in self.KEYWORDS.items()
+                      if any(word in text for word in words)]
+        return conditions or ['other']
+
+    def is_severe(self, text):
+        text = normalize_text(text)
+        return any(word in text for word in self.SEVERE)
+
+    def advise(self, text):
+        conditions = self.classify(text)
+        if conditions == ['other']:
+            lines = ["I'm sorry you're not feeling well. Here are a few general tips:"]
+        else:
+            lines = [f"I'm sorry you're dealing with {' and '.join(conditions)}. Here is what may help:"]
+        for condition in conditions:
+            lines.extend(f'- {tip}' for tip in self.TIPS[condition])
+        if self.is_severe(text):
+            lines.append('Your symptoms sound serious. Please visit one of the nearby hospitals '
+                         'or call your local emergency number right away.')
+        else:
+            lines.append('If your symptoms get worse or persist, please visit a nearby hospital.')
+        return '\n'.join(lines)
+
+    def stream(self, text):
+        for line in self.advise(text).split('\n'):
+            yield line + '\n'
+
+
+class OpenAIAdviceProvider:
+    name = 'openai'
+
+    def __init__(self, api_key=None, model='gpt-4o-mini', timeout=DEFAULT_TIMEOUT):
+        api_key = api_key or os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise ProviderError('OPENAI_API_KEY is not set')
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key, timeout=timeout, max_retries=1)
+        self.model = model
+
+    def advise(self, text):
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{'role': 'system', 'content': ADVICE_PROMPT.format(user_input=text)}]
+            )
+        except Exception as e:
+            raise ProviderError(f'Advice request failed: {e}') from e
+        return response.choices[0].message.content
+
+    def stream(self, text):
+        """Yield the reply in chunks as the model generates it"""
+        try:
+            chunks = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{'role': 'system', 'content': ADVICE_PROMPT.format(user_input=text)}],
+                stream=True
+            )
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise ProviderError(f'Advice request failed: {e}') from e
+
+
+# --- Speech input/output ---
+
+class MicrophoneSpeechInput:
+    """Records one phrase and transcribes it with Google's web API, or
+    offline with CMU Sphinx (engine='sphinx', needs pocketsphinx)"""
+
+    def __init__(self, engine='google', timeout=6, phrase_time_limit=8, operation_timeout=DEFAULT_TIMEOUT):
+        self.engine = engine
+        self.timeout = timeout
+        self.phrase_time_limit = phrase_time_limit
+        self.operation_timeout = operation_timeout
+
+    def listen(self):
+        """The transcript, or None if the speech wasn't understood"""
+        import speech_recognition as sr
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.operation_timeout
+        try:
+            with sr.Microphone() as source:
+                audio = recognizer.listen(source, timeout=self.timeout,
+                                          phrase_time_limit=self.phrase_time_limit)
+            if self.engine == 'sphinx':
+                return recognizer.recognize_sphinx(audio)
+            return recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            return None
+        except (sr.RequestError, sr.WaitTimeoutError, OSError) as e:
+            raise ProviderError(f'Speech recognition unavailable: {e}') from e
+
+
+class ScriptedSpeechInput:
+    """Returns canned phrases in turn instead of using the microphone"""
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self._next = 0
+
+    def listen(self):
+        if not self.phrases:
+            return None
+        phrase = self.phrases[self._next % len(self.phrases)]
+        self._next += 1
+        return phrase
+
+
+class Pyttsx3SpeechOutput:
+    def __init__(self, rate=170):
+        self.rate = rate
+        self._engine = None
+
+    def speak(self, text):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+            self._engine.setProperty('rate', self.rate)
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+
+class SpeechQueue:
+    """Speaks text sentence by sentence on one background thread
+
+    pyttsx3's runAndWait() blocks for the whole utterance and its engine
+    has to stay on the thread that created it, so the wrapped output only
+    ever runs on the queue's thread and callers return immediately.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name='speech-queue', daemon=True)
+        self._thread.start()
+
+    def speak(self, text):
+        sentences, rest = split_sentences(text)
+        for sentence in sentences + [rest.strip()]:
+            if sentence:
+                self._queue.put((self._generation, sentence))
+
+    def cancel(self):
+        """Drop everything not spoken yet, e.g. when a new question comes in"""
+        self._generation += 1
+
+    def join(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            generation, sentence = self._queue.get()
+            try:
+                if generation == self._generation:
+                    self.output.speak(sentence)
+            except Exception as e:
+                print(f"Speech output failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+class SilentSpeechOutput:
+    """Keeps what would have been spoken, for tests and headless machines"""
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text):
+        self.spoken.append(text)
+
+
+# --- Location ---
+
+class IpInfoLocationProvider:
+    name = 'ipinfo'
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def locate(self):
+        import requests
+        try:
+            data = requests.get('https://ipinfo.io/json', timeout=self.timeout).json()
+            lat, lon = data['loc'].split(',')
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise ProviderError(f'Location lookup failed: {e}') from e
+        return {'city': data.get('city'), 'region': data.get('region'), 'lat': float(lat), 'lon': float(lon)}
+
+
+class FixedLocationProvider:
+    name = 'fixed'
+
+    def __init__(self, lat, lon, city=None, region=None):
+        self.location = {'city': city, 'region': region, 'lat': float(lat), 'lon': float(lon)}
+
+    def locate(self):
+        return dict(self.location)
+
+
+# --- Hospitals ---
+
+class PlacesHospitalProvider:
+    name = 'places'
+
+    def __init__(self, api_key=None, radius_m=3000, limit=5, timeout=DEFAULT_TIMEOUT):
+        self.api_key = api_key or os.environ.get('GOOGLE_MAPS_API_KEY')
+        if not self.api_key:
+            raise ProviderError('GOOGLE_MAPS_API_KEY is not set')
+        self.radius_m = radius_m
+        self.limit = limit
+        self.timeout = timeout
+
+    def nearby(self, lat, lon):
+        import requests
+        params = {'location': f'{lat},{lon}', 'radius': self.radius_m, 'type': 'hospital', 'key': self.api_key}
+        try:
+            response = requests.get('https://maps.googleapis.com/maps/api/place/nearbysearch/json',
+                                    params=params, timeout=self.timeout)
+            results = response.json().get('results', [])
+        except (requests.RequestException, ValueError) as e:
+            raise ProviderError(f'Hospital lookup failed: {e}') from e
+        hospitals = []
+        for place in results[:self.limit]:
+            position = place.get('geometry', {}).get('location', {})
+            hospitals.append({'name': place.get('name'), 'address': place.get('vicinity'),
+                              'lat': position.get('lat'), 'lon': position.get('lng')})
+        return hospitals
+
+
+class LocalHospitalProvider:
+    """Nearby hospitals from a local dataset, see utils/hospital_index.py
+
+    With a `refresh` provider (e.g. PlacesHospitalProvider), each area is
+    refreshed from it at most once per `refresh_ttl` seconds. That happens
+    in the background unless the local dataset has nothing for the area
+    yet. New hospitals are merged into the index and, with `save_path`,
+    written back to the dataset.
+    """
+
+    name = 'local'
+
+    def __init__(self, index, radius_km=3.0, limit=5, refresh=None, refresh_ttl=86400, save_path=None):
+        self.index = index
+        self.radius_km = radius_km
+        self.limit = limit
+        self.refresh = refresh
+        self.refresh_ttl = refresh_ttl
+        self.save_path = save_path
+        self._refreshed = {}  # location_key -> time of the last refresh
+        self._lock = threading.Lock()
+
+    def nearby(self, lat, lon):
+        hospitals = self.index.query(lat, lon, radius_km=self.radius_km, k=self.limit)
+        if self.refresh is not None and self._claim_refresh(lat, lon):
+            if hospitals:
+                threading.Thread(target=self._refresh, args=(lat, lon), name='hospital-refresh',
+                                 daemon=True).start()
+            elif self._refresh(lat, lon):
+                hospitals = self.index.query(lat, lon, radius_km=self.radius_km, k=self.limit)
+        return hospitals
+
+    def _claim_refresh(self, lat, lon):
+        key = location_key(lat, lon, precision=1)
+        now = time.time()
+        with self._lock:
+            if now - self._refreshed.get(key, 0.0) < self.refresh_ttl:
+                return False
+            self._refreshed[key] = now
+            return True
+
+    def _refresh(self, lat, lon):
+        """Merge the refresh provider's hospitals around lat/lon, return how many were new"""
+        try:
+            hospitals = [hospital for hospital in self.refresh.nearby(lat, lon)
+                         if hospital.get('lat') is not None and hospital.get('lon') is not None]
+        except ProviderError as e:
+            print(f"Hospital refresh failed: {e}")
+            return 0
+        added = self.index.extend(hospitals)
+        if added and self.save_path:
+            self.index.save_csv(self.save_path)
+        return added
+
+
+# --- Assistant ---
+
+class Assistant:
+    """The chatbot's providers with TTL memoization of their results
+
+    Streamlit re-runs the whole script on every interaction, so repeated
+    advice, location and hospital lookups are answered from the cache
+    instead of the network. When an online provider fails, the offline
+    fallback (if any) answers instead.
+    """
+
+    def __init__(self, advice, hospitals, location=None, speech_input=None, speech_output=None,
+                 fallback_advice=None, fallback_hospitals=None, cache=None):
+        self.advice = advice
+        self.hospitals = hospitals
+        self.location = location
+        self.speech_input = speech_input
+        self.speech_output = speech_output
+        self.fallback_advice = fallback_advice
+        self.fallback_hospitals = fallback_hospitals
+        self.cache = cache or ResultCache(max_entries=512, ttl=int(os.environ.get('ASSISTANT_CACHE_TTL', '3600')))
+
+    def _memoized(self, scope, provider, key, compute):
+        cache_key = ResultCache.make_key(key.encode('utf-8'), provider.name, scope)
+        result = self.cache.get(cache_key)
+        if result is None:
+            result = compute()
+            if result:
+                self.cache.put(cache_key, result)
+        return result
+
+    def _with_fallback(self, scope, primary, fallback, key, call):
+        try:
+            return self._memoized(scope, primary, key, lambda: call(primary))
+        except ProviderError:
+            if fallback is None:
+                raise
+            return self._memoized(scope, fallback, key, lambda: call(fallback))
+
+    def advice_for(self, text):
+        return self._with_fallback('advice', self.advice, self.fallback_advice,
+                                   normalize_text(text), lambda provider: provider.advise(text))
+
+    def stream_advice(self, text):
+        """Yield the advice in chunks as it is generated
+
+        Cached advice comes back as one chunk. A provider failing before
+        its first chunk hands over to the fallback.
+        """
+        key = normalize_text(text).encode('utf-8')
+        providers = [provider for provider in (self.advice, self.fallback_advice) if provider is not None]
+        for i, provider in enumerate(providers):
+            cache_key = ResultCache.make_key(key, provider.name, 'advice')
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+            chunks = []
+            try:
+                for chunk in provider.stream(text):
+                    chunks.append(chunk)
+                    yield chunk
+            except ProviderError:
+                if chunks or i == len(providers) - 1:
+                    raise
+                continue
+            if chunks:
+                self.cache.put(cache_key, ''.join(chunks))
+            return
+
+    def locate(self):
+        """The user's location as a dict with city, region, lat and lon, or None"""
+        if self.location is None:
+            return None
+        return self._memoized('location', self.location, '', self.location.locate)
+
+    def nearby_hospitals(self, lat, lon):
+        return self._with_fallback('hospitals', self.hospitals, self.fallback_hospitals,
+                                   location_key(lat, lon), lambda provider: provider.nearby(lat, lon))
+
+    def hospitals_near_user(self):
+        """(location, hospitals) for the user's current location"""
+        location = self.locate()
+        if not location:
+            return None, []
+        return location, self.nearby_hospitals(location['lat'], location['lon'])
+
+    def listen(self):
+        return self.speech_input.listen() if self.speech_input is not None else None
+
+    def speak(self, text):
+        if self.speech_output is not None:
+            self.speech_output.speak(text)
+
+    def stop_speaking(self):
+        cancel = getattr(self.speech_output, 'cancel', None)
+        if cancel is not None:
+            cancel()
+
+
+def build_assistant(offline=None):
+    """Assistant using online providers where API keys are configured and
+    offline stand-ins otherwise, or everywhere with ASSISTANT_OFFLINE=1
+
+    ASSISTANT_LOCATION="lat,lon[,city,region]" replaces the IP geolocation
+    lookup. Hospitals are always looked up in the local dataset given by
+    HOSPITALS_DATASET (CSV or GeoJSON, loaded once here); with a Maps API
+    key the Places API only refreshes it.
+    """
+    if offline is None:
+        offline = os.environ.get('ASSISTANT_OFFLINE') == '1'
+
+    template = TemplateAdviceProvider()
+    dataset = os.environ.get('HOSPITALS_DATASET')
+    index = HospitalIndex.load(dataset) if dataset and os.path.exists(dataset) else HospitalIndex()
+
+    advice = template
+    refresh = None
+    if not offline:
+        try:
+            advice = OpenAIAdviceProvider()
+        except ProviderError:
+            pass
+        try:
+            # One Places page holds up to 20 results, keep them all for the index
+            refresh = PlacesHospitalProvider(limit=20)
+        except ProviderError:
+            pass
+
+    # Refreshed hospitals are saved back to a CSV dataset, created if missing
+    save_path = dataset if dataset and dataset.lower().endswith('.csv') else None
+    hospitals = LocalHospitalProvider(index, refresh=refresh, save_path=save_path)
+
+    fixed = os.environ.get('ASSISTANT_LOCATION')
+    if fixed:
+        location = FixedLocationProvider(*[part.strip() for part in fixed.split(',')[:4]])
+    else:
+        location = None if offline else IpInfoLocationProvider()
+
+    return Assistant(
+        advice=advice,
+        hospitals=hospitals,
+        location=location,
+        speech_input=MicrophoneSpeechInput(engine='sphinx' if offline else 'google'),
+        speech_output=SpeechQueue(Pyttsx3SpeechOutput()),
+        fallback_advice=template if advice is not template else None
+    )
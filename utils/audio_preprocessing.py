@@ -0,0 +1,73 @@
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+from utils.analysis_settings import MAX_AUDIO_SECONDS, MAX_AUDIO_UPLOAD_BYTES, SAMPLE_RATE
+
+@lru_cache(maxsize=16)
+def decimation_filter(factor):
+    """Anti-aliasing FIR filter for integer-factor downsampling (cached)"""
+    from scipy.signal import firwin
+    half_len = 10 * factor
+    return firwin(2 * half_len + 1, 1.0 / factor, window=('kaiser', 5.0)).astype(np.float32)
+
+
+class AudioPreprocessor:
+    """Bounded, float32 mono audio loading for the voice analyzer
+
+    Uploads larger than `max_upload_bytes` are rejected before decoding,
+    and only the first `max_duration` seconds of a recording are decoded.
+    The result is always float32 mono at `target_sr`.
+    """
+
+    def __init__(self, target_sr=SAMPLE_RATE, max_duration=MAX_AUDIO_SECONDS,
+                 max_upload_bytes=MAX_AUDIO_UPLOAD_BYTES):
+        self.target_sr = target_sr
+        self.max_duration = max_duration
+        self.max_upload_bytes = max_upload_bytes
+
+    @property
+    def max_samples(self):
+        return int(self.target_sr * self.max_duration)
+
+    def accepts_upload(self, n_bytes):
+        """Whether an upload of n_bytes is small enough to decode"""
+        return n_bytes is not None and n_bytes <= self.max_upload_bytes
+
+    def load(self, audio_path):
+        """Decode at most max_duration seconds, returning (y, sr)"""
+        try:
+            info = sf.info(audio_path)
+        except RuntimeError:
+            # Not a format libsndfile knows (e.g. WebM from the browser) -
+            # fall back to librosa/audioread, which can stop after max_duration
+            import librosa
+            y, sr = librosa.load(audio_path, sr=None, mono=True,
+                                 duration=self.max_duration, dtype=np.float32)
+        else:
+            sr = info.samplerate
+            frames = min(info.frames, int(sr * self.max_duration))
+            y, sr = sf.read(audio_path, frames=frames, dtype='float32', always_2d=True)
+            y = y.mean(axis=1, dtype=np.float32)
+
+        y = self.resample(y, sr)
+        return y[:self.max_samples], self.target_sr
+
+    def resample(self, y, sr):
+        """Resample to target_sr, using a cached polyphase filter for integer ratios"""
+        y = np.asarray(y, dtype=np.float32)
+        if sr == self.target_sr:
+            return y
+
+        divisor = gcd(int(sr), self.target_sr)
+        up, down = self.target_sr // divisor, int(sr) // divisor
+        if up == 1:
+            # 48 kHz / 32 kHz -> 16 kHz and friends: cheap decimation
+            from scipy.signal import resample_poly
+            y = resample_poly(y, 1, down, window=decimation_filter(down))
+        else:
+            import librosa
+            y = librosa.resample(y, orig_sr=sr, target_sr=self.target_sr, res_type='soxr_mq')
+        return y.astype(np.float32, copy=False)
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+from utils.analysis_settings import CELL_SIZE, CHIP_SIZE, N_BINS
+
+
+class ExpressionFeatureExtractor:
+    def __init__(self, chip_size=CHIP_SIZE, cell_size=CELL_SIZE, n_bins=N_BINS):
+        # Every face is resized to the same chip, so the cost per face is
+        # constant and scores don't depend on how close the user sits
+        self.chip_size = chip_size
+        self.cell_size = cell_size
+        self.n_bins = n_bins
+        self.n_cells = chip_size // cell_size
+
+        # Cell rows covering the brow/forehead (top third) and the mouth
+        # (bottom third) - the regions that tense up under stress
+        third = max(1, self.n_cells // 3)
+        self.tension_rows = np.r_[0:third, self.n_cells - third:self.n_cells]
+
+        # Score mapping for the tension ratio (tension energy / overall energy).
+        # The ratio peaks when all the energy is in the tension rows, so that
+        # maps to 100
+        self.tension_range = (0.8, self.n_cells / len(self.tension_rows))
+
+    def make_chip(self, frame, face_roi):
+        """Crop the face region and resize it to a grayscale float32 chip"""
+        x, y, w, h = face_roi
+        face = frame[y:y+h, x:x+w]
+        if face.ndim == 3:
+            face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        chip = cv2.resize(face, (self.chip_size, self.chip_size), interpolation=cv2.INTER_AREA)
+        return chip.astype(np.float32) / 255.0
+
+    def make_chips(self, frame, face_rois):
+        """Build a (N, chip_size, chip_size) batch of chips from one frame"""
+        if len(face_rois) == 0:
+            return np.empty((0, self.chip_size, self.chip_size), dtype=np.float32)
+        return np.stack([self.make_chip(frame, roi) for roi in face_rois])
+
+    def _as_batch(self, chips):
+        chips = np.asarray(chips, dtype=np.float32)
+        if chips.ndim == 2:
+            chips = chips[np.newaxis]
+        return chips
+
+    def gradient_histograms(self, chips):
+        """Per-cell orientation histograms weighted by gradient magnitude
+
+        Returns an array of shape (N, n_cells, n_cells, n_bins).
+        """
+        chips = self._as_batch(chips)
+        n = chips.shape[0]
+
+        # Normalize contrast per chip so lighting changes don't move the score
+        mean = chips.mean(axis=(1, 2), keepdims=True)
+        std = chips.std(axis=(1, 2), keepdims=True)
+        chips = (chips - mean) / (std + 1e-6)
+
+        # Central differences (zero gradient on the border)
+        gx = np.zeros_like(chips)
+        gy = np.zeros_like(chips)
+        gx[:, :, 1:-1] = chips[:, :, 2:] - chips[:, :, :-2]
+        gy[:, 1:-1, :] = chips[:, 2:, :] - chips[:, :-2, :]
+
+        magnitude = np.hypot(gx, gy)
+        # Unsigned orientation in [0, pi)
+        orientation = np.arctan2(gy, gx) % np.pi
+        bins = np.minimum((orientation / np.pi * self.n_bins).astype(np.intp), self.n_bins - 1)
+
+        c = self.cell_size
+        k = self.n_cells
+        usable = k * c
+        magnitude = magnitude[:, :usable, :usable]
+        bins = bins[:, :usable, :usable]
+
+        hist = np.zeros((n, k, k, self.n_bins), dtype=np.float32)
+        for b in range(self.n_bins):
+            weighted = np.where(bins == b, magnitude, 0.0)
+            hist[..., b] = weighted.reshape(n, k, c, k, c).sum(axis=(2, 4))
+        return hist
+
+    def extract(self, chips):
+        """HOG-style feature vectors, one L2-normalized row per chip"""
+        hist = self.gradient_histograms(chips)
+        n = hist.shape[0]
+        norms = np.sqrt((hist ** 2).sum(axis=-1, keepdims=True)) + 1e-6
+        return (hist / norms).reshape(n, -1)
+
+    def stress_scores(self, chips):
+        """Stress score (0-100) for every chip in the batch"""
+        hist = self.gradient_histograms(chips)
+        cell_energy = hist.sum(axis=-1)
+
+        overall = cell_energy.mean(axis=(1, 2))
+        tension = cell_energy[:, self.tension_rows, :].mean(axis=(1, 2))
+        ratio = tension / (overall + 1e-6)
+
+        low, high = self.tension_range
+        scores = (ratio - low) / (high - low) * 100
+        return np.clip(scores, 0, 100)
@@ -1,19 +1,67 @@
 import cv2
 import numpy as np
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from utils.wellness_scoring import wellness_index
+from utils.expression_features import ExpressionFeatureExtractor
+from utils.analysis_settings import settings_version
+from utils.frame_change import FrameChangeDetector
+from utils.profiling import metrics, timed_stage
+
+metrics.describe('wellness_face_frames_total', 'Analyzed face frames, by whether detection results were reused')
+
+class StreamState:
+    """What FaceAnalyzer remembers about one person's stream of frames"""
+    
+    def __init__(self, change_threshold):
+        self.lock = threading.Lock()  # one frame of the stream at a time
+        self.face_roi = None
+        self.eye_strain_frames = 0
+        self.blink_count = 0
+        self.last_blink_time = datetime.now()
+        self.change_detector = FrameChangeDetector(change_threshold) if change_threshold else None
+        self.last_detection = None  # (face_detected, face_roi, eyes, stress_score)
 
 class FaceAnalyzer:
-    def __init__(self):
+    def __init__(self, change_threshold=12.0, max_streams=256):
         # Initialize face detection model (using Haar Cascade for simplicity)
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
         
+        # Scale-normalized expression features on a fixed-size face chip
+        self.expression_extractor = ExpressionFeatureExtractor()
+        
         # Initialize variables for frame analysis
         self.prev_frame_time = 0
-        self.face_roi = None
-        self.eye_strain_frames = 0
-        self.blink_count = 0
-        self.last_blink_time = datetime.now()
+        
+        # Near-identical frames reuse the last face/eye detection and
+        # expression score; None analyzes every frame in full
+        self.change_threshold = change_threshold
+        
+        # Blink, eye strain and frame change state per stream (e.g. per
+        # user), the least recently used are dropped beyond max_streams
+        self.max_streams = max_streams
+        self._streams = OrderedDict()
+        self._streams_lock = threading.Lock()
+    
+    def stream(self, key=None):
+        """The state of stream key, created on first use"""
+        with self._streams_lock:
+            state = self._streams.get(key)
+            if state is None:
+                state = self._streams[key] = StreamState(self.change_threshold)
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(key)
+            return state
+    
+    def reset(self, stream=None):
+        """Forget a stream's blink, eye strain and frame change state, e.g.
+        before analyzing an unrelated image"""
+        with self._streams_lock:
+            self._streams.pop(stream, None)
         
     def detect_face(self, frame):
         """Detect face in the frame"""
@@ -22,7 +70,6 @@ class FaceAnalyzer:
         
         if len(faces) > 0:
             x, y, w, h = faces[0]
-            self.face_roi = (x, y, w, h)
             return True, (x, y, w, h)
         return False, None
     
@@ -33,19 +80,21 @@ class FaceAnalyzer:
         eyes = self.eye_cascade.detectMultiScale(face_gray)
         return eyes
     
-    def analyze_eye_strain(self, eyes, frame_count):
+    def analyze_eye_strain(self, eyes, frame_count, state=None):
         """Analyze eye strain based on eye detection"""
+        state = state or self.stream()
         if len(eyes) < 2:  # If eyes not detected
-            self.eye_strain_frames += 1
+            state.eye_strain_frames += 1
         else:
-            self.eye_strain_frames = max(0, self.eye_strain_frames - 0.5)
+            state.eye_strain_frames = max(0, state.eye_strain_frames - 0.5)
             
         # Calculate eye strain score (0-100)
-        eye_strain = min(100, (self.eye_strain_frames / frame_count) * 100) if frame_count > 0 else 0
+        eye_strain = min(100, (state.eye_strain_frames / frame_count) * 100) if frame_count > 0 else 0
         return eye_strain
     
-    def detect_blinks(self, eyes, frame):
+    def detect_blinks(self, eyes, frame, current_time=None, state=None):
         """Detect blinks based on eye aspect ratio"""
+        state = state or self.stream()
         if len(eyes) >= 2:
             # Simple blink detection based on eye aspect ratio
             eye1 = eyes[0]
@@ -61,37 +110,49 @@ class FaceAnalyzer:
             
             # If both eyes are closed (simplified)
             if ear1 < 0.2 and ear2 < 0.2:
-                current_time = datetime.now()
-                time_diff = (current_time - self.last_blink_time).total_seconds()
+                # Recorded video passes its own frame time
+                if current_time is None:
+                    current_time = datetime.now()
+                time_diff = (current_time - state.last_blink_time).total_seconds()
                 
                 if time_diff > 0.3:  # Prevent multiple detections for the same blink
-                    self.blink_count += 1
-                    self.last_blink_time = current_time
+                    state.blink_count += 1
+                    state.last_blink_time = current_time
                     
-        return self.blink_count
+        return state.blink_count
     
     def analyze_facial_expressions(self, frame, face_roi):
         """Analyze facial expressions for stress indicators"""
         # This is a simplified version - in a real app, use a proper model
-        x, y, w, h = face_roi
-        face_roi = frame[y:y+h, x:x+w]
-        
-        # Convert to grayscale and calculate image moments
-        gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-        moments = cv2.moments(cv2.Canny(gray, 100, 200))
-        
-        # Calculate stress score based on image moments (simplified)
-        stress_score = min(100, (moments['mu20'] + moments['mu02']) / 1000)
-        return stress_score
+        chip = self.expression_extractor.make_chip(frame, face_roi)
+        return float(self.expression_extractor.stress_scores(chip)[0])
+    
+    def analyze_facial_expressions_batch(self, frame, face_rois):
+        """Stress scores for several faces of the same frame in one pass"""
+        chips = self.expression_extractor.make_chips(frame, face_rois)
+        return self.expression_extractor.stress_scores(chips)
     
     def calculate_wellness_index(self, stress_score, fatigue_score):
         """Calculate overall wellness index (0-100)"""
         # Weighted average with stress having more impact
-        wellness = 100 - (0.6 * stress_score + 0.4 * fatigue_score)
-        return max(0, min(100, wellness))
+        return float(wellness_index(stress_score, fatigue_score, 'face'))
+    
+    def config_version(self):
+        """Short hash of the settings that affect analysis results"""
+        extractor = self.expression_extractor
+        return settings_version(extractor.chip_size, extractor.cell_size, extractor.n_bins)
     
-    def analyze(self, frame):
-        """Main analysis function"""
+    def analyze(self, frame, timestamp=None, stream=None):
+        """Main analysis function
+        
+        stream identifies whose frame this is (e.g. the user id): blinks,
+        eye strain and reused detections are tracked per stream.
+        """
+        state = self.stream(stream)
+        with state.lock:
+            return self._analyze(frame, timestamp, state)
+    
+    def _analyze(self, frame, timestamp, state):
         # Initialize default results
         results = {
             'face_detected': False,
@@ -102,30 +163,51 @@ class FaceAnalyzer:
             'eye_strain': 0
         }
         
-        # Detect face
-        face_detected, face_roi = self.detect_face(frame)
+        detector = state.change_detector
+        with timed_stage('face.change_check'):
+            reuse = detector is not None and not detector.changed(frame)
+        metrics.inc('wellness_face_frames_total', analysis='reused' if reuse else 'full')
+        
+        if reuse:
+            face_detected, face_roi, eyes, stress_score = state.last_detection
+        else:
+            # Detect face
+            with timed_stage('face.detect_face'):
+                face_detected, face_roi = self.detect_face(frame)
+            eyes, stress_score = None, None
+            if face_detected:
+                # Detect eyes
+                with timed_stage('face.detect_eyes'):
+                    eyes = self.detect_eyes(frame, face_roi)
         results['face_detected'] = face_detected
         
         if face_detected:
-            # Detect eyes
-            eyes = self.detect_eyes(frame, face_roi)
-            
-            # Analyze eye strain and blinks
-            results['eye_strain'] = self.analyze_eye_strain(eyes, 30)  # 30 frames buffer
-            results['blink_count'] = self.detect_blinks(eyes, frame)
+            # Eye strain and blinks are updated on every frame, also when
+            # the detections are reused, so their time windows stay right
+            results['eye_strain'] = self.analyze_eye_strain(eyes, 30, state)  # 30 frames buffer
+            results['blink_count'] = self.detect_blinks(eyes, frame, timestamp, state)
             
             # Calculate fatigue score based on eye metrics
             results['fatigue_score'] = min(100, results['eye_strain'] * 0.7 + 
                                          (30 - min(30, results['blink_count'])) * 0.3)
             
             # Analyze facial expressions for stress
-            results['stress_score'] = self.analyze_facial_expressions(frame, face_roi)
+            if stress_score is None:
+                with timed_stage('face.expressions'):
+                    stress_score = self.analyze_facial_expressions(frame, face_roi)
+            results['stress_score'] = stress_score
             
             # Calculate overall wellness index
             results['wellness_index'] = self.calculate_wellness_index(
                 results['stress_score'], results['fatigue_score'])
             
             # Add timestamp
-            results['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            results['timestamp'] = (timestamp or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+        
+        if face_detected:
+            state.face_roi = face_roi
+        if detector is not None and not reuse:
+            detector.update(frame, face_roi)
+            state.last_detection = (face_detected, face_roi, eyes, stress_score)
             
         return results
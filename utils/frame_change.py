@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+
+
+class FrameChangeDetector:
+    """Tells whether a frame differs visibly from the last analyzed one
+
+    Frames are reduced to a small grayscale thumbnail of the face region
+    (or the whole frame while no face is known) by area averaging, which
+    also averages out sensor noise. A frame counts as changed when any
+    thumbnail cell moved more than `threshold` gray levels from the
+    reference, so a local change like a blink is caught even when the
+    rest of the face is still. The reference is only replaced when a
+    frame is analyzed, so slow drift adds up until it triggers too.
+    """
+
+    def __init__(self, threshold=12.0, size=(32, 32), margin=0.25, max_reuse=30):
+        self.threshold = threshold
+        self.size = size
+        self.margin = margin  # ROI padding, so a face moving out of it is noticed
+        self.max_reuse = max_reuse  # analyze at least every max_reuse + 1 frames
+        self.frames = 0
+        self.skipped = 0
+        self._reference = None
+        self._region = None
+        self._shape = None
+        self._reused = 0
+
+    @property
+    def skip_rate(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return {'frames': self.frames, 'skipped': self.skipped, 'skip_rate': self.skip_rate}
+
+    def region(self, shape, roi):
+        """The compared area: the face ROI plus margin, or the whole frame"""
+        height, width = shape[:2]
+        if roi is None:
+            return 0, 0, width, height
+        x, y, w, h = roi
+        pad_x, pad_y = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        return x0, y0, min(width, x + w + pad_x) - x0, min(height, y + h + pad_y) - y0
+
+    def thumbnail(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, frame):
+        """Whether frame needs a full analysis, False if the last results can be reused
+
+        After analyzing a frame, pass it to update() as the new reference.
+        """
+        self.frames += 1
+        if self._reference is None or self._reused >= self.max_reuse:
+            return True
+        x, y, w, h = self._region
+        if frame.shape[:2] != self._shape:
+            return True
+        thumbnail = self.thumbnail(frame[y:y+h, x:x+w])
+        if np.abs(thumbnail - self._reference).max() > self.threshold:
+            return True
+        self._reused += 1
+        self.skipped += 1
+        return False
+
+    def update(self, frame, roi=None):
+        """Make an analyzed frame the reference; roi is the face found in it"""
+        self._shape = frame.shape[:2]
+        self._region = x, y, w, h = self.region(frame.shape, roi)
+        self._reference = self.thumbnail(frame[y:y+h, x:x+w])
+        self._reused = 0
+
+    def invalidate(self):
+        """Force a full analysis of the next frame"""
+        self._reference = None
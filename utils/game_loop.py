@@ -0,0 +1,106 @@
+import time
+
+import pygame
+
+# Toggles the FPS/CPU overlay in the games
+OVERLAY_KEY = pygame.K_F3
+
+
+class GameClock:
+    """Frame pacing for the relaxation games
+
+    While something is animating, frames run at up to max_fps. Otherwise
+    the loop sleeps in pygame.event.wait until input or a timer arrives,
+    so a static scene uses no CPU. dt is the time since the previous frame
+    in seconds, for frame-rate independent animation.
+    """
+
+    def __init__(self, max_fps=60, max_dt=0.25):
+        self.max_fps = max_fps
+        self.max_dt = max_dt
+        self.dt = 0.0
+        self.frames = 0
+        self._clock = pygame.time.Clock()
+        self._last = time.perf_counter()
+
+    def events(self, animating, wake_after_ms=0):
+        """Wait for the next frame and return its events
+
+        When not animating, blocks until an event arrives, or at most
+        wake_after_ms if that is set (0 waits indefinitely).
+        """
+        if animating:
+            self._clock.tick(self.max_fps)
+            events = pygame.event.get()
+        else:
+            first = pygame.event.wait(wake_after_ms)
+            events = [first] + pygame.event.get() if first.type != pygame.NOEVENT else []
+
+        now = time.perf_counter()
+        # After an idle wait there's nothing to catch up on
+        self.dt = min(now - self._last, self.max_dt) if animating else 0.0
+        self._last = now
+        self.frames += 1
+        return events
+
+
+class PerfOverlay:
+    """FPS and process CPU usage in the top-left corner, toggled with F3
+
+    The numbers refresh once a second; while visible the game loop should
+    wake at least that often (see wake_after_ms).
+    """
+
+    REFRESH_MS = 1000
+
+    def __init__(self, color=(60, 60, 60)):
+        self.visible = False
+        self.color = color
+        self.rect = None  # where the overlay was last drawn
+        self._font = None
+        self._text = 'measuring...'
+        self._frames = 0
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    @property
+    def wake_after_ms(self):
+        return self.REFRESH_MS if self.visible else 0
+
+    def handle(self, event):
+        """Process a key event; returns True if the overlay was toggled"""
+        if event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+            self.visible = not self.visible
+            return True
+        return False
+
+    def frame(self):
+        """Count a frame; returns True when the numbers changed"""
+        self._frames += 1
+        now = time.perf_counter()
+        elapsed = now - self._wall
+        if elapsed * 1000 < self.REFRESH_MS:
+            return False
+        cpu = time.process_time()
+        self._text = f'{self._frames / elapsed:5.1f} fps  cpu {100 * (cpu - self._cpu) / elapsed:5.1f}%'
+        self._frames = 0
+        self._wall, self._cpu = now, cpu
+        return True
+
+    def draw(self, surface, restore):
+        """Draw (or clear) the overlay and return the changed rects
+
+        restore(rect) must repaint the scene under rect.
+        """
+        dirty = []
+        if self.rect is not None:
+            restore(self.rect)
+            dirty.append(self.rect)
+            self.rect = None
+        if self.visible:
+            if self._font is None:
+                self._font = pygame.font.Font(None, 22)
+            text = self._font.render(self._text, True, self.color)
+            self.rect = surface.blit(text, (8, 8))
+            dirty.append(self.rect)
+        return dirty
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import threading
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vectors(lat, lon):
+    """Points on the unit sphere, where straight-line (chord) distance
+    grows monotonically with great-circle distance"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class HospitalIndex:
+    """KD-tree over hospital locations for local k-nearest and radius lookups
+
+    Each hospital is a dict with at least name, address, lat and lon. The
+    tree is built over 3D unit vectors rather than raw lat/lon, so lookups
+    stay correct near the poles and the antimeridian, and results are
+    ranked by great-circle distance.
+    """
+
+    def __init__(self, hospitals=()):
+        self._lock = threading.Lock()
+        # Swapped as a whole on every rebuild, so queries never see a half-built index
+        self._state = ([], None)
+        self.extend(hospitals)
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def hospitals(self):
+        return self._state[0]
+
+    @staticmethod
+    def _normalize(hospital):
+        return dict(hospital, lat=float(hospital['lat']), lon=float(hospital['lon']),
+                    address=hospital.get('address') or '')
+
+    @staticmethod
+    def _identity(hospital):
+        return hospital['name'], round(hospital['lat'], 4), round(hospital['lon'], 4)
+
+    def extend(self, hospitals):
+        """Bulk-add hospitals, skipping ones already indexed. Returns how many were added"""
+        from scipy.spatial import cKDTree
+        with self._lock:
+            current, _ = self._state
+            seen = {self._identity(hospital) for hospital in current}
+            added = []
+            for hospital in hospitals:
+                hospital = self._normalize(hospital)
+                identity = self._identity(hospital)
+                if identity not in seen:
+                    seen.add(identity)
+                    added.append(hospital)
+            if not added and self._state[1] is not None:
+                return 0
+            merged = current + added
+            tree = None
+            if merged:
+                tree = cKDTree(to_unit_vectors([h['lat'] for h in merged], [h['lon'] for h in merged]))
+            self._state = (merged, tree)
+            return len(added)
+
+    def add(self, hospital):
+        return self.extend([hospital])
+
+    # --- Loading and saving ---
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a CSV with name, address, lat and lon columns"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls(row for row in csv.DictReader(f) if row.get('lat') and row.get('lon'))
+
+    @classmethod
+    def from_geojson(cls, path):
+        """Load Point features, taking name and address from their properties"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        hospitals = []
+        for feature in data.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                continue
+            lon, lat = geometry['coordinates'][:2]
+            properties = feature.get('properties') or {}
+            name = properties.get('name')
+            if not name:
+                continue
+            address = properties.get('address') or properties.get('addr:full') or ' '.join(
+                str(properties[key]) for key in ('addr:housenumber', 'addr:street', 'addr:city')
+                if properties.get(key))
+            hospitals.append({'name': name, 'address': address, 'lat': lat, 'lon': lon})
+        return cls(hospitals)
+
+    @classmethod
+    def load(cls, path):
+        """Load a .csv or .geojson/.json dataset"""
+        if os.path.splitext(path)[1].lower() in ('.geojson', '.json'):
+            return cls.from_geojson(path)
+        return cls.from_csv(path)
+
+    def save_csv(self, path):
+        hospitals = self.hospitals
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['name', 'address', 'lat', 'lon'], extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(hospitals)
+        os.replace(temp_path, path)
+
+    # --- Queries ---
+
+    def _results(self, hospitals, lat, lon, indices):
+        if len(indices) == 0:
+            return []
+        indices = np.asarray(indices)
+        lats = np.array([hospitals[i]['lat'] for i in indices])
+        lons = np.array([hospitals[i]['lon'] for i in indices])
+        chords = np.linalg.norm(to_unit_vectors(lats, lons) - to_unit_vectors([lat], [lon]), axis=1)
+        distances = chord_to_km(chords)
+        order = np.argsort(distances, kind='stable')
+        return [dict(hospitals[indices[i]], distance_km=round(float(distances[i]), 3)) for i in order]
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """The k nearest hospitals (optionally within max_km), nearest first"""
+        hospitals, tree = self._state
+        if tree is None or k <= 0:
+            return []
+        upper = km_to_chord(max_km) * (1 + 1e-9) if max_km is not None else np.inf
+        _, indices = tree.query(to_unit_vectors([float(lat)], [float(lon)])[0],
+                                k=min(k, len(hospitals)), distance_upper_bound=upper)
+        indices = np.atleast_1d(indices)
+        return self._results(hospitals, float(lat), float(lon), indices[indices < len(hospitals)])
+
+    def within(self, lat, lon, radius_km, k=None):
+        """Hospitals within radius_km, nearest first, at most k of them"""
+        hospitals, tree = self._state
+        if tree is None:
+            return []
+        indices = tree.query_ball_point(to_unit_vectors([float(lat)], [float(lon)])[0],
+                                        km_to_chord(radius_km) * (1 + 1e-9))
+        results = self._results(hospitals, float(lat), float(lon), indices)
+        return results[:k] if k is not None else results
+
+    def query(self, lat, lon, radius_km=3.0, k=5):
+        """Up to k hospitals within radius_km, nearest first, with distance_km added"""
+        return self.nearest(lat, lon, k=k, max_km=radius_km)
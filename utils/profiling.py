@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast polling requests to long voice clips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histograms and counters rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = Counter()  # (name, labels) -> value
+        self._collectors = []  # callables returning {(name, labels): value} gauges
+        self._help = {}
+        self._lock = threading.Lock()
+        self._recording = threading.local()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def _record(self, kind, name, value, labels):
+        records = getattr(self._recording, 'records', None)
+        if records is not None:
+            records.append((kind, name, value, labels))
+
+    @contextmanager
+    def recording(self):
+        """Collect the observations and increments of this thread in a list
+
+        Used in analysis pool processes, whose own registry is never
+        scraped; the parent replays the list with replay().
+        """
+        records = self._recording.records = []
+        try:
+            yield records
+        finally:
+            self._recording.records = None
+
+    def observe(self, name, value, **labels):
+        self._record('observe', name, value, labels)
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        self._record('inc', name, value, labels)
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def add_collector(self, collector):
+        """Register a callable that returns {name: value} gauges at scrape time"""
+        self._collectors.append(collector)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = ['{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                   for k, v in pairs]
+        return '{' + ','.join(escaped) + '}'
+
+    def render(self):
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                header(name, 'histogram')
+                cumulative = 0
+                for upper, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self._labels(labels, [("le", upper)])} {cumulative}')
+                lines.append(f'{name}_bucket{self._labels(labels, [("le", "+Inf")])} {histogram.count}')
+                lines.append(f'{name}_sum{self._labels(labels)} {histogram.total}')
+                lines.append(f'{name}_count{self._labels(labels)} {histogram.count}')
+
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, 'counter')
+                lines.append(f'{name}{self._labels(labels)} {value}')
+
+        for collector in self._collectors:
+            for name, value in sorted(collector().items()):
+                header(name, 'gauge')
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+metrics.describe('wellness_stage_duration_seconds', 'Time spent in each analysis stage')
+metrics.describe('wellness_request_duration_seconds', 'Request latency per route')
+
+# Per-thread stage timings of the request being handled
+_current = threading.local()
+
+
+def _add_stage(stage, elapsed):
+    stages = getattr(_current, 'stages', None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def timed_stage(stage):
+    """Time a block and record it as an analysis stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe('wellness_stage_duration_seconds', elapsed, stage=stage)
+        _add_stage(stage, elapsed)
+
+
+def replay(records):
+    """Record metrics collected by metrics.recording() in another process
+
+    Stage timings also count towards the request being handled.
+    """
+    for kind, name, value, labels in records:
+        getattr(metrics, kind)(name, value, **labels)
+        if kind == 'observe' and name == 'wellness_stage_duration_seconds':
+            _add_stage(labels['stage'], value)
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads from a background thread
+
+    Stacks are collected in the "folded" format (frame;frame;frame count)
+    understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._samples.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._samples:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counter in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    @staticmethod
+    def write_folded(samples, path):
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def init_app(app, slow_request_ms=None, profile_dir='profiles'):
+    """Add request timing hooks and a /metrics endpoint to a Flask app
+
+    With slow_request_ms set, every request is sampled and requests slower
+    than that are written to profile_dir as folded stacks for flame graphs.
+    """
+    from flask import Response, g, request
+
+    profiler = SamplingProfiler() if slow_request_ms else None
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        _current.stages = {}
+        if profiler is not None:
+            profiler.start(threading.get_ident())
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe('wellness_request_duration_seconds', elapsed,
+                        route=route, method=request.method)
+        metrics.inc('wellness_requests_total', route=route, method=request.method,
+                    status=response.status_code)
+
+        stages = getattr(_current, 'stages', None) or {}
+        _current.stages = None
+        if profiler is not None:
+            samples = profiler.stop(threading.get_ident())
+            if elapsed * 1000 >= slow_request_ms and samples:
+                os.makedirs(profile_dir, exist_ok=True)
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{route.strip('/').replace('/', '_') or 'root'}-{int(elapsed * 1000)}ms.folded"
+                SamplingProfiler.write_folded(samples, os.path.join(profile_dir, name))
+                print(f"Slow request {request.method} {route}: {elapsed * 1000:.0f} ms, stages {stages}")
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return profiler
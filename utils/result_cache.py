@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class DiskCacheTier:
+    """SQLite-backed cache shared by every worker process on the machine"""
+
+    def __init__(self, path, ttl=3600, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_created ON results (created)')
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value, created FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, key, value):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)',
+                         (key, value, time.time()))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries and the oldest ones above max_entries"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM results WHERE created < ?', (time.time() - self.ttl,))
+            conn.execute('DELETE FROM results WHERE key IN ('
+                         'SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                         (self.max_entries,))
+
+
+class ResultCache:
+    """Bounded in-process LRU cache for analysis results
+
+    Entries expire after `ttl` seconds and the cache holds at most
+    `max_entries` results and `max_bytes` of serialized results. When
+    `disk_path` is set, results are also written to a SQLite file so other
+    worker processes can reuse them.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, ttl=600, disk_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = DiskCacheTier(disk_path, ttl=ttl) if disk_path else None
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, serialized)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(data, config_version, scope=''):
+        """Key for an upload: content hash + analyzer config (+ optional scope)"""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return f'{scope}:{config_version}:{digest}'
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[2])
+                self._remove(key)
+
+        if self.disk is not None:
+            serialized = self.disk.get(key)
+            if serialized is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, serialized, now)
+                return json.loads(serialized)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        serialized = json.dumps(result)
+        with self._lock:
+            self._store(key, serialized, time.time())
+        if self.disk is not None:
+            self.disk.put(key, serialized)
+
+    def _store(self, key, serialized, now):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (now + self.ttl, size, serialized)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
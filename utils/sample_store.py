@@ -0,0 +1,249 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# One file per column and user/day: <root>/<user_id>/<YYYY-MM-DD>/<column>.bin
+COLUMNS = {
+    'timestamp': np.int64,   # milliseconds since the epoch, UTC
+    'stress': np.float32,
+    'fatigue': np.float32,
+    'wellness': np.float32,
+    'source': np.uint8,      # index into SOURCES
+}
+SOURCES = ('face', 'voice', 'webcam')
+
+
+def to_millis(value):
+    """Epoch milliseconds for a naive-UTC/aware datetime or epoch seconds"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value * 1000)
+
+
+def from_millis(millis):
+    """Naive UTC datetime, like the datetime.utcnow() defaults of the models"""
+    return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+def day_of(millis):
+    return from_millis(millis).strftime('%Y-%m-%d')
+
+
+class SampleStore:
+    """Append-only columnar store for high-rate wellness samples
+
+    Each user/day partition holds one raw little-endian array file per
+    column, so a day of 1 Hz samples is ~1.8 MB instead of ~86k ORM rows.
+    Reads memory-map the files and slice them by timestamp, which doesn't
+    copy anything for ranges within one day. Appends take a per-user file
+    lock, so several worker processes can share the store.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.root, str(user_id))
+
+    def _path(self, user_id, day, column):
+        return os.path.join(self._user_dir(user_id), day, f'{column}.bin')
+
+    def users(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+
+    def days(self, user_id):
+        directory = self._user_dir(user_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if not name.startswith('.'))
+
+    @contextmanager
+    def _locked(self, user_id):
+        with self._locks_guard:
+            lock = self._locks.setdefault(user_id, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self._user_dir(user_id), exist_ok=True)
+            with open(os.path.join(self._user_dir(user_id), '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rows(self, user_id, day):
+        """Complete rows in a partition (a crash can leave columns uneven)"""
+        counts = []
+        for column, dtype in COLUMNS.items():
+            path = self._path(user_id, day, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        return min(counts)
+
+    def _last_timestamp(self, user_id):
+        for day in reversed(self.days(user_id)):
+            rows = self._rows(user_id, day)
+            if rows:
+                with open(self._path(user_id, day, 'timestamp'), 'rb') as f:
+                    f.seek((rows - 1) * np.dtype(np.int64).itemsize)
+                    return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+        return None
+
+    def append(self, user_id, timestamp, stress, fatigue, wellness, source='face'):
+        """Append one sample; returns the user's previous sample time (ms) or None
+
+        Timestamps are kept in order per user, a sample older than the
+        previous one is stored at the previous one's time.
+        """
+        millis = to_millis(timestamp)
+        values = {'stress': stress, 'fatigue': fatigue, 'wellness': wellness,
+                  'source': SOURCES.index(source)}
+        with self._locked(user_id):
+            previous = self._last_timestamp(user_id)
+            if previous is not None:
+                millis = max(millis, previous)
+            day = day_of(millis)
+            os.makedirs(os.path.join(self._user_dir(user_id), day), exist_ok=True)
+            rows = self._rows(user_id, day)
+            values['timestamp'] = millis
+            for column, dtype in COLUMNS.items():
+                with open(self._path(user_id, day, column), 'ab') as f:
+                    # Drop a partial row left behind by a crash mid-append
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+                    f.write(np.asarray([values[column] or 0], dtype=np.dtype(dtype).newbyteorder('<')).tobytes())
+        return previous
+
+    def update_day(self, user_id, day, update):
+        """Rewrite a user/day partition as update(samples), under the user's lock
+
+        update gets writable copies of the stored columns and returns the
+        new ones. The new partition is written next to the old one and
+        swapped in with renames, so readers never see a half-written day.
+        """
+        with self._locked(user_id):
+            samples = update({column: np.array(values) for column, values in self.read_day(user_id, day).items()})
+            order = np.argsort(samples['timestamp'], kind='stable')
+            directory = os.path.join(self._user_dir(user_id), day)
+            staging = os.path.join(self._user_dir(user_id), f'.new-{day}')
+            retired = os.path.join(self._user_dir(user_id), f'.old-{day}')
+            for leftover in (staging, retired):
+                shutil.rmtree(leftover, ignore_errors=True)
+            os.makedirs(staging)
+            for column, dtype in COLUMNS.items():
+                values = np.asarray(samples[column])[order].astype(np.dtype(dtype).newbyteorder('<'))
+                with open(os.path.join(staging, f'{column}.bin'), 'wb') as f:
+                    f.write(values.tobytes())
+            if os.path.isdir(directory):
+                os.rename(directory, retired)
+            os.rename(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+
+    def merge(self, user_id, samples):
+        """Insert samples, replacing stored ones with the same time and source
+
+        Used for offline rescoring; returns (replaced, inserted) counts.
+        """
+        counts = [0, 0]
+        days = np.array([day_of(millis) for millis in samples['timestamp']])
+        for day in np.unique(days):
+            new = {column: np.asarray(samples[column])[days == day] for column in COLUMNS}
+            new_keys = new['timestamp'].astype(np.int64) * len(SOURCES) + new['source']
+
+            def update(old):
+                old_keys = old['timestamp'] * len(SOURCES) + old['source']
+                keep = ~np.isin(old_keys, new_keys)
+                counts[0] += int((~keep).sum())
+                counts[1] += len(new_keys) - int((~keep).sum())
+                return {column: np.concatenate([old[column][keep], new[column]]) for column in COLUMNS}
+
+            self.update_day(user_id, day, update)
+        return tuple(counts)
+
+    def _read_day(self, user_id, day, start, end):
+        rows = self._rows(user_id, day)
+        if not rows:
+            return None
+        arrays = {column: np.memmap(self._path(user_id, day, column), dtype=np.dtype(dtype).newbyteorder('<'),
+                                    mode='r', shape=(rows,))
+                  for column, dtype in COLUMNS.items()}
+        lo = np.searchsorted(arrays['timestamp'], start, 'left') if start is not None else 0
+        hi = np.searchsorted(arrays['timestamp'], end, 'left') if end is not None else rows
+        return {column: array[lo:hi] for column, array in arrays.items()}
+
+    def read_day(self, user_id, day):
+        """All samples of one user/day partition, memory-mapped"""
+        samples = self._read_day(user_id, day, None, None)
+        if samples is None:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+        return samples
+
+    def read(self, user_id, start=None, end=None):
+        """Samples with start <= timestamp < end as column arrays
+
+        start/end are datetimes or epoch seconds. Ranges within one day
+        are read-only memory-mapped views; longer ones are concatenated.
+        """
+        start = to_millis(start) if start is not None else None
+        end = to_millis(end) if end is not None else None
+        first_day = day_of(start) if start is not None else None
+        last_day = day_of(end - 1) if end is not None else None
+
+        parts = []
+        for day in self.days(user_id):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            part = self._read_day(user_id, day, start, end)
+            if part is not None and len(part['timestamp']):
+                parts.append(part)
+
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+        return {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+
+    def export_parquet(self, user_id, day, path):
+        """Write one user/day partition as a Parquet file (needs pyarrow)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        samples = self._read_day(user_id, day, None, None)
+        if samples is None:
+            return False
+        table = pa.table({
+            'timestamp': pa.array(np.asarray(samples['timestamp']), type=pa.timestamp('ms', tz='UTC')),
+            'stress': np.asarray(samples['stress']),
+            'fatigue': np.asarray(samples['fatigue']),
+            'wellness': np.asarray(samples['wellness']),
+            'source': pa.DictionaryArray.from_arrays(np.asarray(samples['source']).astype(np.int8), list(SOURCES)),
+        })
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pq.write_table(table, path, compression='zstd')
+        return True
+
+    def export_parquet_dataset(self, out_root, users=None):
+        """Write every partition as <out_root>/user_id=<id>/day=<day>/samples.parquet"""
+        users = users if users is not None else sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        written = 0
+        for user_id in users:
+            for day in self.days(user_id):
+                path = os.path.join(out_root, f'user_id={user_id}', f'day={day}', 'samples.parquet')
+                written += self.export_parquet(user_id, day, path)
+        return written
+
@@ -0,0 +1,265 @@
+import json
+import math
+import threading
+from datetime import datetime
+
+from utils.wellness_scoring import FUSION_WEIGHTS, score
+
+METRICS = ('stress', 'fatigue', 'wellness')
+# Keys of the metrics in FaceAnalyzer/VoiceAnalyzer/webcam results
+RESULT_KEYS = {'stress': 'stress_score', 'fatigue': 'fatigue_score', 'wellness': 'wellness_index'}
+MODALITIES = ('face', 'voice', 'webcam')
+
+
+class RunningStats:
+    """Count, mean, variance, min and max updated one value at a time (Welford)"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Combine with stats collected elsewhere (Chan et al.)"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def as_dict(self):
+        if not self.count:
+            return {'count': 0}
+        return {'count': self.count, 'mean': self.mean, 'std': self.std, 'min': self.min, 'max': self.max}
+
+
+def _metric_stats():
+    return {metric: RunningStats() for metric in METRICS}
+
+
+class WellnessSession:
+    """Aggregates the face, voice and webcam results of one user session
+
+    Keeps running statistics per modality and metric and, if
+    detail_seconds is set, the per-bucket means of each modality as a
+    downsampled timeline. close() returns one summary for the session.
+    modality overrides the weight profile of the overall scores.
+    """
+
+    def __init__(self, user_id=None, started=None, detail_seconds=60, modality=None):
+        self.user_id = user_id
+        self.started = started or datetime.utcnow()
+        self.last_seen = self.started
+        self.detail_seconds = detail_seconds
+        self.modality = modality
+        self.stats = {}  # modality -> metric -> RunningStats
+        self.detail = []  # finished buckets, see _flush_bucket
+        self._buckets = {}  # modality -> (bucket start, metric -> RunningStats)
+        self.ended = None
+        self._lock = threading.Lock()
+
+    def ingest(self, modality, result, timestamp=None):
+        """Add one analysis result; results without a measurement are ignored"""
+        if modality not in MODALITIES:
+            raise ValueError(f'Unknown modality: {modality}')
+        if 'error' in result or result.get('face_detected') is False:
+            return False
+        values = {metric: result.get(key) for metric, key in RESULT_KEYS.items()}
+        if any(value is None for value in values.values()):
+            return False
+        timestamp = timestamp or datetime.utcnow()
+
+        with self._lock:
+            if self.ended is not None:
+                return False
+            stats = self.stats.setdefault(modality, _metric_stats())
+            for metric, value in values.items():
+                stats[metric].update(value)
+            self.last_seen = max(self.last_seen, timestamp)
+
+            if self.detail_seconds:
+                start = self._bucket_start(timestamp)
+                bucket = self._buckets.get(modality)
+                if bucket is None or bucket[0] != start:
+                    if bucket is not None:
+                        self._flush_bucket(modality, *bucket)
+                    bucket = self._buckets[modality] = (start, _metric_stats())
+                for metric, value in values.items():
+                    bucket[1][metric].update(value)
+        return True
+
+    def _bucket_start(self, timestamp):
+        offset = (timestamp - self.started).total_seconds()
+        return int(max(offset, 0) // self.detail_seconds) * self.detail_seconds
+
+    def _flush_bucket(self, modality, start, stats):
+        self.detail.append({
+            'offset_seconds': start,
+            'modality': modality,
+            'count': stats['wellness'].count,
+            **{f'{metric}_mean': stats[metric].mean for metric in METRICS},
+        })
+
+    @property
+    def sample_count(self):
+        return sum(stats['wellness'].count for stats in self.stats.values())
+
+    def overall(self):
+        """Session-level stress, fatigue and wellness scores
+
+        Face and voice means are fused with FUSION_WEIGHTS; the webcam
+        tracker is only used when neither of them produced results.
+        """
+        fused = [modality for modality in FUSION_WEIGHTS if modality in self.stats]
+        if fused:
+            total = sum(FUSION_WEIGHTS[modality] for modality in fused)
+            stress = sum(FUSION_WEIGHTS[m] * self.stats[m]['stress'].mean for m in fused) / total
+            fatigue = sum(FUSION_WEIGHTS[m] * self.stats[m]['fatigue'].mean for m in fused) / total
+            scores = score(stress, fatigue, self.modality or ('multimodal' if len(fused) > 1 else fused[0]))
+        elif 'webcam' in self.stats:
+            stress = self.stats['webcam']['stress'].mean
+            fatigue = self.stats['webcam']['fatigue'].mean
+            scores = score(stress, fatigue, self.modality or 'webcam')
+        else:
+            return None
+        return {
+            'stress_level': float(stress),
+            'fatigue_level': float(fatigue),
+            'wellness_index': float(scores['wellness_index']),
+            'risk_level': str(scores['risk_level']),
+        }
+
+    def summary(self):
+        """Summary of the session so far (or in full, once closed)"""
+        with self._lock:
+            return {
+                'user_id': self.user_id,
+                'started': self.started,
+                'ended': self.ended or self.last_seen,
+                'duration_seconds': ((self.ended or self.last_seen) - self.started).total_seconds(),
+                'samples': self.sample_count,
+                'overall': self.overall(),
+                'modalities': {modality: {metric: stats[metric].as_dict() for metric in METRICS}
+                               for modality, stats in self.stats.items()},
+                'detail': list(self.detail) if self.detail_seconds else None,
+            }
+
+    def close(self, ended=None):
+        """Finish the session and return its summary"""
+        with self._lock:
+            if self.ended is None:
+                for modality, bucket in sorted(self._buckets.items(), key=lambda item: item[1][0]):
+                    self._flush_bucket(modality, *bucket)
+                self._buckets.clear()
+                self.detail.sort(key=lambda entry: entry['offset_seconds'])
+                self.ended = ended or self.last_seen
+        return self.summary()
+
+
+class SessionTracker:
+    """Open sessions by user, closed after idle_timeout seconds without results
+
+    Sessions live in the memory of this process; with several web workers
+    a user's results are summarized per worker, and close_all() must run
+    before the process exits. on_close(summary) is called for every
+    closed session that has samples.
+    """
+
+    def __init__(self, idle_timeout=300, detail_seconds=60, on_close=None):
+        self.idle_timeout = idle_timeout
+        self.detail_seconds = detail_seconds
+        self.on_close = on_close
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def current(self, user_id):
+        with self._lock:
+            return self._sessions.get(user_id)
+
+    def ingest(self, user_id, modality, result, timestamp=None):
+        """Add a result to the user's session, starting one if needed"""
+        timestamp = timestamp or datetime.utcnow()
+        self.close_idle(timestamp)
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._sessions[user_id] = WellnessSession(user_id, timestamp, self.detail_seconds)
+        session.ingest(modality, result, timestamp)
+        return session
+
+    def close(self, user_id, ended=None):
+        """Close the user's session; returns its summary, or None without samples"""
+        with self._lock:
+            session = self._sessions.pop(user_id, None)
+        return self._finish(session, ended)
+
+    def close_all(self):
+        """Close every open session, e.g. when the process exits"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        return [summary for summary in (self._finish(session) for session in sessions) if summary]
+
+    def close_idle(self, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            idle = [user_id for user_id, session in self._sessions.items()
+                    if (now - session.last_seen).total_seconds() > self.idle_timeout]
+            sessions = [self._sessions.pop(user_id) for user_id in idle]
+        return [summary for summary in (self._finish(session) for session in sessions) if summary]
+
+    def _finish(self, session, ended=None):
+        if session is None:
+            return None
+        summary = session.close(ended)
+        if not summary['samples']:
+            return None
+        if self.on_close is not None:
+            self.on_close(summary)
+        return summary
+
+
+def summary_row(summary):
+    """Column values of the session_summary row for a session summary"""
+    overall = summary['overall']
+    return {
+        'user_id': summary['user_id'],
+        'started_at': summary['started'],
+        'ended_at': summary['ended'],
+        'sample_count': summary['samples'],
+        'stress_level': overall['stress_level'],
+        'fatigue_level': overall['fatigue_level'],
+        'wellness_index': overall['wellness_index'],
+        'risk_level': overall['risk_level'],
+        'modalities': json.dumps(summary['modalities']),
+        'detail': json.dumps(summary['detail']) if summary['detail'] is not None else None,
+    }
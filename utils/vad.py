@@ -0,0 +1,110 @@
+import numpy as np
+
+class VoiceActivityDetector:
+    """Cheap energy + zero-crossing-rate voice activity detection
+
+    The background noise level is estimated as a low percentile of the
+    frame energies. Frames are speech when their energy is within
+    `energy_range_db` of the loudest frame and at least `snr_db` above the
+    noise. Frames with a ZCR typical of unvoiced consonants also count,
+    if they are `unvoiced_snr_db` above the noise and within `consonant`
+    seconds of a voiced frame, so hiss on its own is never speech. Short
+    gaps are bridged and very short bursts dropped, so the result is a
+    list of speech segments rather than a flickering frame mask.
+
+    A clip without quiet frames (less than twice `snr_db` between the
+    noise estimate and the loudest frame) has no noise level to compare
+    against: it is all speech or all noise. There the loud frames with
+    the low ZCR of voiced speech are speech.
+    """
+
+    def __init__(self, sample_rate=16000, frame_length=0.025, hop_length=0.010,
+                 energy_range_db=35.0, energy_floor_db=-60.0, zcr_threshold=0.25,
+                 min_speech=0.1, min_pause=0.2, noise_percentile=10.0, snr_db=12.0,
+                 unvoiced_snr_db=6.0, consonant=0.15):
+        self.sample_rate = sample_rate
+        self.frame_size = int(frame_length * sample_rate)
+        self.hop_size = int(hop_length * sample_rate)
+        self.energy_range_db = energy_range_db
+        self.energy_floor_db = energy_floor_db
+        self.zcr_threshold = zcr_threshold
+        self.noise_percentile = noise_percentile
+        self.snr_db = snr_db
+        self.unvoiced_snr_db = unvoiced_snr_db
+        self.consonant_frames = max(1, int(round(consonant / hop_length)))
+        self.min_speech_frames = max(1, int(round(min_speech / hop_length)))
+        self.min_pause_frames = max(1, int(round(min_pause / hop_length)))
+
+    def frames(self, y):
+        """Strided (n_frames, frame_size) view of the signal, no copy"""
+        if len(y) < self.frame_size:
+            y = np.pad(y, (0, self.frame_size - len(y)))
+        n_frames = 1 + (len(y) - self.frame_size) // self.hop_size
+        return np.lib.stride_tricks.as_strided(
+            y, shape=(n_frames, self.frame_size),
+            strides=(y.strides[0] * self.hop_size, y.strides[0]),
+            writeable=False)
+
+    def speech_mask(self, y):
+        """Boolean speech flag per frame"""
+        frames = self.frames(np.asarray(y, dtype=np.float32))
+        energy = np.mean(frames ** 2, axis=1)
+        energy_db = 10 * np.log10(energy + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        peak_db = energy_db.max()
+        noise_db = max(np.percentile(energy_db, self.noise_percentile), self.energy_floor_db)
+        if peak_db - noise_db < 2 * self.snr_db:
+            # The percentile landed on the signal itself, e.g. a held vowel
+            noise_db = max(peak_db - self.energy_range_db, self.energy_floor_db)
+            voiced = (energy_db > noise_db) & (zcr <= self.zcr_threshold)
+        else:
+            voiced = energy_db > max(peak_db - self.energy_range_db, noise_db + self.snr_db)
+        # Unvoiced consonants: noisy (high ZCR), above the noise and next to
+        # voiced frames
+        near_voiced = np.convolve(voiced, np.ones(2 * self.consonant_frames + 1), 'same') > 0
+        unvoiced = (zcr > self.zcr_threshold) & (energy_db > noise_db + self.unvoiced_snr_db) & near_voiced
+        mask = voiced | unvoiced
+        return self._smooth(mask)
+
+    def _smooth(self, mask):
+        """Bridge short pauses, then drop short bursts"""
+        mask = mask.copy()
+        for value, min_length in ((False, self.min_pause_frames), (True, self.min_speech_frames)):
+            starts, ends = self._runs(mask == value)
+            for start, end in zip(starts, ends):
+                # Leading/trailing silence isn't a pause inside speech
+                if not value and (start == 0 or end == len(mask)):
+                    continue
+                if end - start < min_length:
+                    mask[start:end] = not value
+        return mask
+
+    @staticmethod
+    def _runs(mask):
+        """Start and end (exclusive) frame index of every True run"""
+        padded = np.concatenate(([False], mask, [False]))
+        changes = np.flatnonzero(padded[1:] != padded[:-1])
+        return changes[::2], changes[1::2]
+
+    def segments(self, y):
+        """Speech segments as (start_sample, end_sample) pairs"""
+        mask = self.speech_mask(y)
+        starts, ends = self._runs(mask)
+        return [(int(s * self.hop_size), int(min(len(y), e * self.hop_size + self.frame_size)))
+                for s, e in zip(starts, ends)]
+
+    def pause_statistics(self, segments, n_samples):
+        """Silence ratio and pause counts/durations from a segmentation"""
+        duration = n_samples / self.sample_rate
+        speech = sum(end - start for start, end in segments) / self.sample_rate
+        pauses = [(segments[i + 1][0] - segments[i][1]) / self.sample_rate
+                  for i in range(len(segments) - 1)]
+        return {
+            'speech_duration': speech,
+            'silence_ratio': 1 - speech / duration if duration > 0 else 0.0,
+            'pause_count': len(pauses),
+            'mean_pause': float(np.mean(pauses)) if pauses else 0.0,
+            'max_pause': float(np.max(pauses)) if pauses else 0.0
+        }
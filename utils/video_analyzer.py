@@ -0,0 +1,139 @@
+import os
+import cv2
+import numpy as np
+from datetime import datetime, timedelta
+from utils.face_analyzer import FaceAnalyzer
+
+class VideoAnalyzer:
+    def __init__(self, every_n_frames=None, target_fps=1.0, seek_threshold=None):
+        # Sample either every Nth frame or at a target rate (samples per second)
+        self.every_n_frames = every_n_frames
+        self.target_fps = target_fps
+
+        # Gaps of at least this many frames are skipped with a seek, which
+        # jumps to the nearest keyframe instead of decoding every frame in
+        # between. Shorter gaps are cheaper to grab() through. Defaults to
+        # the sampling gap, so the default one sample per second always
+        # seeks, capped at about two seconds of video (a typical browser
+        # keyframe interval) and never below half a second.
+        self.seek_threshold = seek_threshold
+
+    def open(self, video_path):
+        """Open a video file, returning (capture, fps, frame_count)"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return None, 0, 0
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Browser recordings (WebM) often report no or bogus frame rates
+        if not fps or fps <= 0 or fps > 240:
+            fps = 30.0
+        return cap, fps, frame_count
+
+    def sample_step(self, fps):
+        """Number of frames between two analyzed frames"""
+        if self.every_n_frames:
+            return max(1, int(self.every_n_frames))
+        if self.target_fps:
+            return max(1, int(round(fps / self.target_fps)))
+        return 1
+
+    @staticmethod
+    def default_seek_threshold(fps, step):
+        keyframe_interval = int(fps * 2)
+        return max(int(fps / 2), min(step - 1, keyframe_interval))
+
+    def iter_frames(self, video_path):
+        """Yield (frame_index, offset_seconds, frame) for the sampled frames only"""
+        cap, fps, frame_count = self.open(video_path)
+        if cap is None:
+            print(f"Error opening video: {video_path}")
+            return
+
+        step = self.sample_step(fps)
+        seek_threshold = self.seek_threshold or self.default_seek_threshold(fps, step)
+        # Seeking needs a trustworthy frame count, otherwise grab sequentially
+        can_seek = frame_count > 0
+
+        try:
+            position = 0      # index of the next frame the decoder returns
+            next_index = 0    # index of the next frame we want
+            while not can_seek or next_index < frame_count:
+                gap = next_index - position
+                if can_seek and gap >= seek_threshold:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, next_index)
+                else:
+                    # grab() advances without converting the frame to BGR
+                    for _ in range(gap):
+                        if not cap.grab():
+                            return
+
+                success, frame = cap.read()
+                if not success:
+                    return
+
+                yield next_index, next_index / fps, frame
+                position = next_index + 1
+                next_index += step
+        finally:
+            cap.release()
+
+    def iter_results(self, video_path, start_time=None, face_analyzer=None):
+        """Yield one FaceAnalyzer result per sampled frame"""
+        if start_time is None:
+            start_time = self.recording_start(video_path)
+        # Fresh analyzer per recording so blink/eye strain state doesn't leak
+        analyzer = face_analyzer or FaceAnalyzer()
+
+        for frame_index, offset, frame in self.iter_frames(video_path):
+            timestamp = start_time + timedelta(seconds=offset)
+            results = analyzer.analyze(frame, timestamp)
+            results['frame_index'] = frame_index
+            results['offset'] = offset
+            results['time'] = timestamp
+            yield results
+
+    def recording_start(self, video_path):
+        """Best guess of when a recording started (UTC)
+
+        The file is written when recording stops, so the start is the
+        modification time minus the video duration.
+        """
+        end = datetime.utcfromtimestamp(os.path.getmtime(video_path))
+        cap, fps, frame_count = self.open(video_path)
+        if cap is None:
+            return end
+        cap.release()
+        return end - timedelta(seconds=max(0, frame_count) / fps)
+
+    def analyze_video(self, video_path, start_time=None):
+        """Analyze a recording and return its time series
+
+        `samples` holds one row per analyzed frame with a detected face,
+        using the WellnessData column names.
+        """
+        offsets = []
+        samples = []
+        frames_analyzed = 0
+
+        for results in self.iter_results(video_path, start_time):
+            frames_analyzed += 1
+            if not results['face_detected']:
+                continue
+            offsets.append(results['offset'])
+            samples.append({
+                'timestamp': results['time'],
+                'stress_level': float(results['stress_score']),
+                'fatigue_level': float(results['fatigue_score']),
+                'wellness_index': float(results['wellness_index'])
+            })
+
+        return {
+            'frames_analyzed': frames_analyzed,
+            'faces_detected': len(samples),
+            'offsets': np.array(offsets, dtype=np.float64),
+            'stress_level': np.array([s['stress_level'] for s in samples], dtype=np.float32),
+            'fatigue_level': np.array([s['fatigue_level'] for s in samples], dtype=np.float32),
+            'wellness_index': np.array([s['wellness_index'] for s in samples], dtype=np.float32),
+            'samples': samples
+        }
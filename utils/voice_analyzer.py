@@ -1,36 +1,36 @@
 import numpy as np
 import librosa
-import soundfile as sf
 import os
 from datetime import datetime
+from utils.analysis_settings import (FATIGUE_THRESHOLDS, MAX_AUDIO_SECONDS, SAMPLE_RATE,
+                                     STRESS_THRESHOLDS, settings_version)
+from utils.audio_preprocessing import AudioPreprocessor
+from utils.profiling import timed_stage
+from utils.vad import VoiceActivityDetector
+from utils.wellness_scoring import wellness_index
 
 class VoiceAnalyzer:
     def __init__(self):
         # Initialize parameters
-        self.sample_rate = 16000  # Hz
+        self.sample_rate = SAMPLE_RATE  # Hz
         self.frame_length = 0.025  # 25ms
         self.hop_length = 0.010    # 10ms
         self.n_fft = 512
         
-        # Stress and fatigue thresholds (can be adjusted)
-        self.stress_thresholds = {
-            'pitch_range': (100, 300),  # Hz
-            'jitter_threshold': 0.04,   # 4%
-            'shimmer_threshold': 0.15,  # 15%
-            'hfd_threshold': 2.5        # Higher order spectral feature
-        }
+        # Bounded decoding: at most a minute of float32 mono audio
+        self.preprocessor = AudioPreprocessor(self.sample_rate, max_duration=MAX_AUDIO_SECONDS)
         
-        self.fatigue_thresholds = {
-            'speech_rate': (3, 5),      # Syllables per second
-            'pause_ratio': 0.2,         # 20% of speech is pauses
-            'h1_h2': 12.0,              # Glottal source feature
-            'cpcs': 0.6                 # Cepstral peak prominence (smoothed)
-        }
+        # Speech segmentation run before feature extraction
+        self.vad = VoiceActivityDetector(self.sample_rate, self.frame_length, self.hop_length)
+        
+        # Stress and fatigue thresholds (can be adjusted per instance)
+        self.stress_thresholds = dict(STRESS_THRESHOLDS)
+        self.fatigue_thresholds = dict(FATIGUE_THRESHOLDS)
     
     def load_audio(self, audio_path):
-        """Load audio file using librosa"""
+        """Load audio file as float32 mono, truncated to the preprocessor's max duration"""
         try:
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
+            y, sr = self.preprocessor.load(audio_path)
             return y, sr
         except Exception as e:
             print(f"Error loading audio: {e}")
@@ -44,40 +44,55 @@ class VoiceAnalyzer:
         features['rms'] = np.sqrt(np.mean(y**2))
         features['zcr'] = np.mean(librosa.feature.zero_crossing_rate(y, frame_length=2048, hop_length=512))
         
-        # Spectral features
-        S = np.abs(librosa.stft(y, n_fft=2048))**2
-        spectral_centroid = librosa.feature.spectral_centroid(S=S).mean()
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(S=S).mean()
+        # Find the speech first - the expensive analysis below only runs on it
+        with timed_stage('voice.vad'):
+            segments = self.vad.segments(y)
+            pauses = self.vad.pause_statistics(segments, len(y))
+        speech = np.concatenate([y[start:end] for start, end in segments]) if segments else y[:0]
         
-        # Pitch and jitter (pitch perturbations)
-        f0, voiced_flag, _ = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), 
-                                        fmax=librosa.note_to_hz('C7'),
-                                        sr=self.sample_rate)
-        f0 = f0[voiced_flag]
+        # Spectral features
+        if len(speech) >= 2048:
+            with timed_stage('voice.stft'):
+                S = np.abs(librosa.stft(speech, n_fft=2048))**2
+                spectral_centroid = librosa.feature.spectral_centroid(S=S).mean()
+                spectral_bandwidth = librosa.feature.spectral_bandwidth(S=S).mean()
+        else:
+            spectral_centroid = 0
+            spectral_bandwidth = 0
+        
+        # Pitch and jitter (pitch perturbations), per segment so that pitch
+        # jumps between two utterances don't count as jitter
+        f0_segments = []
+        with timed_stage('voice.pyin'):
+            for start, end in segments:
+                if end - start < 2048:  # shorter than one pyin frame
+                    continue
+                f0, voiced_flag, _ = librosa.pyin(y[start:end], fmin=librosa.note_to_hz('C2'), 
+                                                fmax=librosa.note_to_hz('C7'),
+                                                sr=self.sample_rate)
+                f0_segments.append(f0[voiced_flag])
+        f0 = np.concatenate(f0_segments) if f0_segments else np.array([])
         
         if len(f0) > 1:
-            jitter = np.mean(np.abs(np.diff(f0))) / np.mean(f0)
+            diffs = np.concatenate([np.abs(np.diff(seg)) for seg in f0_segments if len(seg) > 1] or [np.zeros(1)])
+            jitter = np.mean(diffs) / np.mean(f0)
             pitch_range = np.max(f0) - np.min(f0)
         else:
             jitter = 0
             pitch_range = 0
         
         # Shimmer (amplitude perturbations)
-        rms_energy = librosa.feature.rms(y=y, frame_length=2048, hop_length=512)[0]
+        rms_energy = librosa.feature.rms(y=speech, frame_length=2048, hop_length=512)[0] if len(speech) else []
         if len(rms_energy) > 1:
             shimmer = np.mean(np.abs(np.diff(rms_energy))) / np.mean(rms_energy)
         else:
             shimmer = 0
         
-        # Speech rate estimation (syllables per second)
+        # Speech rate estimation (syllables per second of the whole clip)
         # This is a simplified version - in practice, use a proper speech recognizer
-        speech_rate = len(librosa.onset.onset_detect(y=y, sr=self.sample_rate)) / (len(y) / self.sample_rate)
-        
-        # Pause ratio (silence ratio)
-        y_harmonic = librosa.effects.harmonic(y)
-        energy = np.abs(librosa.stft(y_harmonic, n_fft=2048, hop_length=512))**2
-        energy_db = librosa.power_to_db(energy, ref=np.max)
-        silence_ratio = np.mean(energy_db < -40)  # Threshold for silence
+        with timed_stage('voice.onset'):
+            onsets = librosa.onset.onset_detect(y=speech, sr=self.sample_rate) if len(speech) >= 2048 else []
+        speech_rate = len(onsets) / (len(y) / self.sample_rate)
         
         # Update features
         features.update({
@@ -87,7 +102,9 @@ class VoiceAnalyzer:
             'shimmer': shimmer,
             'pitch_range': pitch_range,
             'speech_rate': speech_rate,
-            'silence_ratio': silence_ratio,
+            'silence_ratio': pauses['silence_ratio'],
+            'pause_count': pauses['pause_count'],
+            'mean_pause': pauses['mean_pause'],
             'f0_mean': np.mean(f0) if len(f0) > 0 else 0
         })
         
@@ -138,13 +155,17 @@ class VoiceAnalyzer:
     def calculate_wellness_index(self, stress_score, fatigue_score):
         """Calculate overall wellness index (0-100)"""
         # Weighted average with stress having more impact
-        wellness = 100 - (0.6 * stress_score + 0.4 * fatigue_score)
-        return max(0, min(100, wellness))
+        return float(wellness_index(stress_score, fatigue_score, 'voice'))
+    
+    def config_version(self):
+        """Short hash of the settings that affect analysis results"""
+        return settings_version(self.sample_rate, self.stress_thresholds, self.fatigue_thresholds)
     
     def analyze_audio(self, audio_path):
         """Main analysis function"""
         # Load audio
-        y, sr = self.load_audio(audio_path)
+        with timed_stage('voice.load'):
+            y, sr = self.load_audio(audio_path)
         if y is None:
             return {
                 'error': 'Failed to load audio',
@@ -173,7 +194,9 @@ class VoiceAnalyzer:
                 'jitter': float(features.get('jitter', 0)),
                 'shimmer': float(features.get('shimmer', 0)),
                 'speech_rate': float(features.get('speech_rate', 0)),
-                'silence_ratio': float(features.get('silence_ratio', 0))
+                'silence_ratio': float(features.get('silence_ratio', 0)),
+                'pause_count': int(features.get('pause_count', 0)),
+                'mean_pause': float(features.get('mean_pause', 0))
             }
         }
         
@@ -0,0 +1,130 @@
+import numpy as np
+
+# Stress/fatigue weights used to turn scores into a wellness index.
+# The webcam tracker weights don't add up to 1, so its index never drops
+# below 20 - kept as-is so existing dashboards don't shift.
+MODALITY_WEIGHTS = {
+    'face': (0.6, 0.4),
+    'voice': (0.6, 0.4),
+    'multimodal': (0.6, 0.4),
+    'webcam': (0.45, 0.35),
+}
+
+# How much each modality contributes when face and voice are fused
+FUSION_WEIGHTS = {
+    'face': 0.5,
+    'voice': 0.5,
+}
+
+# Upper bound (inclusive) of each wellness index band, see README
+RISK_BAND_EDGES = np.array([40, 65, 85])
+
+RISK_LEVELS = np.array([
+    'CRITICAL/HIGH RISK',
+    'MEDIUM RISK',
+    'LOW/MODERATE RISK',
+    'LOW RISK',
+])
+
+RECOMMENDATIONS = np.array([
+    "🚨 Immediate Rest Alert: Stop working now. Perform a 4-7-8 Breathing Exercise (4s inhale, 7s hold, 8s exhale) for 5 rounds, or take a 10-minute walk.",
+    "💧 Hydration & Mindful Break: Risk is elevated. Take a break, drink a glass of water, and look away from your screen for two minutes.",
+    "🧘 Micro-Break/Stretch: Risk is low. To maintain focus, stand up and stretch for 60 seconds.",
+    "✅ All Good: Great! Maintain your current focus. Remember to drink water.",
+])
+
+
+def wellness_index(stress, fatigue, modality='face'):
+    """Wellness index (0-100) for scalars or arrays of stress/fatigue scores"""
+    stress_weight, fatigue_weight = MODALITY_WEIGHTS[modality]
+    stress = np.asarray(stress, dtype=np.float64)
+    fatigue = np.asarray(fatigue, dtype=np.float64)
+    return np.clip(100 - (stress_weight * stress + fatigue_weight * fatigue), 0, 100)
+
+
+def risk_bands(wellness):
+    """Index into RISK_LEVELS/RECOMMENDATIONS for every wellness value"""
+    return np.searchsorted(RISK_BAND_EDGES, np.asarray(wellness), side='left')
+
+
+def score(stress, fatigue, modality='face'):
+    """Wellness index, risk level and recommendation in one call"""
+    wellness = wellness_index(stress, fatigue, modality)
+    bands = risk_bands(wellness)
+    return {
+        'wellness_index': wellness,
+        'risk_band': bands,
+        'risk_level': RISK_LEVELS[bands],
+        'recommendation': RECOMMENDATIONS[bands],
+    }
+
+
+def to_seconds(times):
+    """Convert datetimes, datetime64 or numbers to float seconds"""
+    times = np.asarray(times)
+    if times.dtype == object or np.issubdtype(times.dtype, np.datetime64):
+        times = times.astype('datetime64[ms]').astype(np.int64) / 1000.0
+    return times.astype(np.float64)
+
+
+def align(reference_times, other_times, tolerance=5.0):
+    """For every reference sample, the index of the nearest other sample
+
+    Samples with nothing within `tolerance` seconds get -1. Both inputs
+    must be sorted.
+    """
+    reference = to_seconds(reference_times)
+    other = to_seconds(other_times)
+    if len(other) == 0:
+        return np.full(reference.shape, -1, dtype=np.intp)
+
+    right = np.clip(np.searchsorted(other, reference), 0, len(other) - 1)
+    left = np.clip(right - 1, 0, len(other) - 1)
+    use_left = np.abs(reference - other[left]) <= np.abs(other[right] - reference)
+    nearest = np.where(use_left, left, right)
+
+    nearest[np.abs(other[nearest] - reference) > tolerance] = -1
+    return nearest
+
+
+def fuse(face_times, face_stress, face_fatigue,
+         voice_times, voice_stress, voice_fatigue, tolerance=5.0):
+    """Fuse face and voice scores on the face timeline
+
+    Face samples without a voice sample within `tolerance` seconds keep
+    their face-only scores.
+    """
+    face_stress = np.asarray(face_stress, dtype=np.float64)
+    face_fatigue = np.asarray(face_fatigue, dtype=np.float64)
+    voice_stress = np.asarray(voice_stress, dtype=np.float64)
+    voice_fatigue = np.asarray(voice_fatigue, dtype=np.float64)
+
+    matches = align(face_times, voice_times, tolerance)
+    has_voice = matches >= 0
+    safe = np.where(has_voice, matches, 0)
+
+    face_weight = FUSION_WEIGHTS['face']
+    voice_weight = np.where(has_voice, FUSION_WEIGHTS['voice'], 0.0)
+    total = face_weight + voice_weight
+
+    if len(voice_stress) > 0:
+        stress = (face_weight * face_stress + voice_weight * voice_stress[safe]) / total
+        fatigue = (face_weight * face_fatigue + voice_weight * voice_fatigue[safe]) / total
+    else:
+        stress, fatigue = face_stress, face_fatigue
+    return stress, fatigue, has_voice
+
+
+def score_multimodal(face_times, face_stress, face_fatigue,
+                     voice_times, voice_stress, voice_fatigue, tolerance=5.0):
+    """Fuse face and voice samples and score the fused series"""
+    stress, fatigue, has_voice = fuse(face_times, face_stress, face_fatigue,
+                                      voice_times, voice_stress, voice_fatigue,
+                                      tolerance)
+    results = score(stress, fatigue, 'multimodal')
+    results.update({
+        'stress_score': stress,
+        'fatigue_score': fatigue,
+        'has_voice': has_voice,
+    })
+    return results
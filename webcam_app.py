@@ -0,0 +1,172 @@
+# Standalone webcam monitor: streams the local camera with face/eye boxes
+# and serves the tracked scores at /get_wellness_data.
+#
+#   python webcam_app.py   (http://localhost:5051)
+#
+from flask import Flask, render_template, Response, jsonify
+import cv2
+import numpy as np
+import random
+import time
+import os
+from utils.wellness_scoring import score
+from utils.session_aggregator import WellnessSession
+from utils.frame_change import FrameChangeDetector
+
+app = Flask(__name__)
+
+# Initialize OpenCV's face detector
+face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+# Initialize variables for wellness tracking
+blink_counter = 0
+last_blink_time = time.time()
+blink_rate = 0
+fatigue_score = 0
+stress_score = 0
+last_alert_time = time.time()
+frame_count = 0
+
+# Constants
+EYE_CLOSED_FRAMES = 0
+EYE_CLOSED_THRESHOLD = 3  # Number of frames to consider an eye as closed
+
+# Frames that barely differ from the last analyzed one reuse its face and
+# eye detections; blink counting still runs on every frame
+change_detector = FrameChangeDetector()
+
+def generate_frames():
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        print("Error: Could not open webcam")
+        return
+        
+    print("Webcam opened successfully")
+    # Summary of the scores seen while this stream is open
+    session = WellnessSession()
+    try:
+        yield from stream_frames(cap, session)
+    finally:
+        cap.release()
+        summary = session.close()
+        if summary['samples']:
+            print(f"Session summary: {summary['overall']} over {summary['duration_seconds']:.0f}s")
+        print(f"Frames reusing detections: {change_detector.skip_rate:.1%}")
+
+def stream_frames(cap, session):
+    global blink_counter, last_blink_time, blink_rate, fatigue_score, stress_score, last_alert_time, frame_count, EYE_CLOSED_FRAMES
+    
+    faces, face_eyes = (), []
+    change_detector.invalidate()
+    while True:
+        success, frame = cap.read()
+        if not success:
+            print("Error: Could not read frame from webcam")
+            break
+        
+        # Flip the frame horizontally for a later selfie-view display
+        frame = cv2.flip(frame, 1)
+        frame_count += 1
+        
+        # Convert to grayscale for face detection
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # Detect faces and eyes, unless the frame is nearly the same as
+        # the last analyzed one
+        if change_detector.changed(gray):
+            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            face_eyes = [eye_cascade.detectMultiScale(gray[y:y+h, x:x+w]) for (x, y, w, h) in faces]
+            # With several faces the whole frame is compared
+            change_detector.update(gray, faces[0] if len(faces) == 1 else None)
+        
+        for (x, y, w, h), eyes in zip(faces, face_eyes):
+            # Draw rectangle around face
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+            
+            # Region of interest for drawing the eyes
+            roi_color = frame[y:y+h, x:x+w]
+            
+            # Simple blink detection
+            if len(eyes) == 0:  # No eyes detected (blinking)
+                EYE_CLOSED_FRAMES += 1
+                if EYE_CLOSED_FRAMES == EYE_CLOSED_THRESHOLD:  # Just closed
+                    blink_counter += 1
+                    current_time = time.time()
+                    if last_blink_time > 0:
+                        blink_rate = 1.0 / (current_time - last_blink_time)
+                    last_blink_time = current_time
+            else:
+                EYE_CLOSED_FRAMES = 0
+                
+                # Draw rectangles around eyes
+                for (ex, ey, ew, eh) in eyes:
+                    cv2.rectangle(roi_color, (ex, ey), (ex+ew, ey+eh), (0, 255, 0), 2)
+            
+            # Update wellness scores with recovery mechanism
+            current_time = time.time()
+            if current_time - last_alert_time > 10:  # Update scores every 10 seconds
+                # If eyes are open and no stress detected, recover
+                if EYE_CLOSED_FRAMES < EYE_CLOSED_THRESHOLD:  # Eyes are open
+                    # Recover from stress and fatigue
+                    stress_score = max(0, stress_score - random.uniform(1, 5))
+                    fatigue_score = max(0, fatigue_score - random.uniform(0.5, 3))
+                else:
+                    # Increase stress and fatigue if eyes are closed (blinking/straining)
+                    stress_score = min(100, stress_score + random.uniform(1, 3))
+                    fatigue_score = min(100, fatigue_score + random.uniform(0.5, 2))
+                
+                # Add some small random variation
+                stress_score = max(0, min(100, stress_score + random.uniform(-2, 2)))
+                fatigue_score = max(0, min(100, fatigue_score + random.uniform(-1, 1.5)))
+                
+                last_alert_time = current_time
+                session.ingest('webcam', {
+                    'stress_score': stress_score,
+                    'fatigue_score': fatigue_score,
+                    'wellness_index': score(stress_score, fatigue_score, 'webcam')['wellness_index']
+                })
+        
+        # Encode the frame in JPEG format
+        ret, buffer = cv2.imencode('.jpg', frame)
+        frame = buffer.tobytes()
+        
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/video_feed')
+def video_feed():
+    try:
+        return Response(generate_frames(),
+                      mimetype='multipart/x-mixed-replace; boundary=frame')
+    except Exception as e:
+        print(f"Error in video_feed: {str(e)}")
+        return str(e), 500
+
+@app.route('/get_wellness_data')
+def get_wellness_data():
+    global stress_score, fatigue_score
+    
+    # Calculate wellness index (0-100) - higher is better, plus the
+    # matching risk level and recommendation
+    scores = score(stress_score, fatigue_score, 'webcam')
+    wellness_index = float(scores['wellness_index'])
+    risk_level = str(scores['risk_level'])
+    recommendation = str(scores['recommendation'])
+    
+    return jsonify({
+        'wellness_index': int(wellness_index),
+        'stress_score': int(stress_score),
+        'fatigue_score': int(fatigue_score),
+        'blink_rate': round(blink_rate, 2),
+        'frame_skip_rate': round(change_detector.skip_rate, 3),
+        'risk_level': risk_level,
+        'recommendation': recommendation
+    })
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5051, host='0.0.0.0')
@@ -0,0 +1,22 @@
+# Production entry point, see gunicorn.conf.py:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+import os
+
+from app import app, db
+from utils import analysis_pool
+from utils.analyzers import startup_report, warm_up
+
+with app.app_context():
+    db.create_all()
+    # With preload_app the workers are forked from this process and must
+    # not share its pooled database connections
+    db.engine.dispose()
+
+# With gunicorn's preload_app this runs once in the master process, so the
+# cascades and compiled numba code are shared copy-on-write by all workers.
+# When analysis runs in the process pool, those processes warm up instead.
+if os.environ.get('WELLNESS_WARMUP') == '1' and not analysis_pool.enabled():
+    warm_up()
+    print(f"Startup report: {startup_report()}")
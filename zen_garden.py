@@ -1,5 +1,7 @@
 import pygame
-import random
+import numpy as np
+
+from utils.game_loop import GameClock, PerfOverlay
 
 # --- Initialization ---
 pygame.init()
@@ -14,83 +16,163 @@ SAND_COLOR = (244, 235, 204) # Light, calming beige/sand color
 RAKE_COLOR = (150, 150, 150) # Darker gray for the rake line
 LINE_THICKNESS = 4
 
+# Sand settling: how fast (color units per second) rake marks fade back
+# to the sand color, faster when the player isn't actively raking
+FADE_PER_SECOND_RAKING = 20
+FADE_PER_SECOND_IDLE = 60
+# How far the darkest mark is from plain sand, i.e. total fade needed
+FADE_STEPS_MAX = max(sand - rake for sand, rake in zip(SAND_COLOR, RAKE_COLOR))
+
+# Rake points are kept until their marks have settled, at most this many
+POINT_CAPACITY = 4096
+SETTLE_MS = FADE_STEPS_MAX * 1000 // FADE_PER_SECOND_RAKING
+
 # Setup the screen and title
 screen = pygame.display.set_mode(SCREEN_SIZE)
 pygame.display.set_caption("Zen Garden Simulator")
 
-# Game clock
-clock = pygame.time.Clock()
+# Game clock: runs frames only while the sand is settling, otherwise
+# sleeps until the next input event
+game_clock = GameClock(max_fps=60)
+overlay = PerfOverlay()
+
+
+class PointRing:
+    """Fixed-capacity ring buffer of rake points
+
+    Appending overwrites the oldest point once full and expiring moves the
+    tail forward, both O(1) per point. Each point carries the id of its
+    stroke so separate strokes are never joined into one line.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.stroke = np.zeros(capacity, dtype=np.int64)
+        self.time = np.zeros(capacity, dtype=np.int64)  # pygame ticks (ms)
+        self.head = 0  # next write position
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, x, y, stroke, time):
+        self.x[self.head], self.y[self.head] = x, y
+        self.stroke[self.head], self.time[self.head] = stroke, time
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last(self, stroke):
+        """Previous point of this stroke, or None if the stroke just started"""
+        if self.size == 0:
+            return None
+        i = (self.head - 1) % self.capacity
+        if self.stroke[i] != stroke:
+            return None
+        return int(self.x[i]), int(self.y[i])
+
+    def expire(self, before):
+        """Drop points recorded before the given time"""
+        while self.size and self.time[(self.head - self.size) % self.capacity] < before:
+            self.size -= 1
+
+
+def fade_sand(surface, step):
+    """Move every pixel `step` closer to the sand color
+
+    Rake marks are darker than the sand in every channel, so adding and
+    then clamping with MIN settles them to exactly the sand color.
+    """
+    surface.fill((step, step, step), special_flags=pygame.BLEND_RGB_ADD)
+    surface.fill(SAND_COLOR, special_flags=pygame.BLEND_RGB_MIN)
+
+
+def draw_segment(surface, start, end):
+    """Draw one rake segment and return the screen rect it touched"""
+    rect = pygame.draw.line(surface, RAKE_COLOR, start, end, LINE_THICKNESS)
+    return rect.inflate(LINE_THICKNESS, LINE_THICKNESS)
+
 
 # --- Drawing State Variables ---
-# List to store all the points drawn by the mouse
-drawing_points = []
+# Persistent sand: new segments are drawn onto it as they come in and it
+# settles by blending, so history is never redrawn
+sand = pygame.Surface(SCREEN_SIZE)
+sand.fill(SAND_COLOR)
+screen.blit(sand, (0, 0))
+pygame.display.flip()
+
+points = PointRing(POINT_CAPACITY)
+stroke_id = 0
 is_raking = False
+fade_steps_left = 0  # fade still needed before the sand is smooth again
+fade_due = 0.0  # fade accumulated from frame times, applied in whole steps
+
+
+def restore(rect):
+    screen.blit(sand, rect, rect)
+
 
 # --- Main Game Loop ---
 running = True
 while running:
-    
+    # Screen areas changed this frame; only these are sent to the display
+    dirty_rects = []
+    overlay_toggled = False
+
     # 1. Event Handling
-    for event in pygame.event.get():
+    for event in game_clock.events(animating=fade_steps_left > 0, wake_after_ms=overlay.wake_after_ms):
         if event.type == pygame.QUIT:
             running = False
-        
+
+        elif overlay.handle(event):
+            overlay_toggled = True
+
         # Start Raking (Mouse Button Down)
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1: # Left click
                 is_raking = True
-                # Start a new rake stroke with the current mouse position
-                drawing_points.append(pygame.mouse.get_pos()) 
-        
+                # Start a new, separate rake stroke at the current mouse position
+                stroke_id += 1
+                points.append(*event.pos, stroke_id, pygame.time.get_ticks())
+
         # Stop Raking (Mouse Button Up)
         elif event.type == pygame.MOUSEBUTTONUP:
             if event.button == 1:
                 is_raking = False
-        
+
         # Record Mouse Movement (when holding the button down)
         elif event.type == pygame.MOUSEMOTION:
             if is_raking:
-                # Only add a point if the mouse is moving and the button is down
-                drawing_points.append(pygame.mouse.get_pos())
-
-
-    # 2. Drawing (Render)
-    # The first thing we do is fill the screen with the base sand color.
-    screen.fill(SAND_COLOR) 
-
-    # Draw Rake Marks
-    # pygame.draw.lines is used to connect a list of points smoothly
-    if len(drawing_points) > 1:
-        # pygame.draw.aaline(s) are better for smooth lines, but lines() is simpler for beginners
-        pygame.draw.lines(
-            screen,          # Surface to draw on
-            RAKE_COLOR,      # Color of the rake mark
-            False,           # False means don't connect the last point to the first (not a closed loop)
-            drawing_points,  # The list of (x, y) coordinates
-            LINE_THICKNESS   # The thickness of the rake mark
-        )
-
-    # 3. Auto-Smooth/Clear Mechanic (The Zen Part)
-    # To simulate the sand settling, we'll slowly remove older points.
-    # We remove points a little faster when the player isn't actively raking.
-    
-    # Define a clear rate (number of points to remove per frame)
-    if not is_raking and len(drawing_points) > 0:
-        clear_rate = 3  # Faster decay when not raking
-        
-        # Remove a few points from the beginning of the list
-        drawing_points = drawing_points[clear_rate:] 
-    
-    elif is_raking and len(drawing_points) > 200:
-        # If the list gets too long while raking, trim the oldest points for performance
-        drawing_points = drawing_points[1:]
-
-
-    # Update the full screen display
-    pygame.display.flip()
-
-    # Limit frame rate
-    clock.tick(60)
+                previous = points.last(stroke_id)
+                points.append(*event.pos, stroke_id, pygame.time.get_ticks())
+                if previous is not None:
+                    # Draw only the new segment onto the sand
+                    dirty_rects.append(draw_segment(sand, previous, event.pos))
+                    fade_steps_left = FADE_STEPS_MAX
+
+    # 2. Auto-Smooth Mechanic (The Zen Part)
+    # The sand settles by blending towards the sand color; constant cost
+    # no matter how long the player has been raking
+    if fade_steps_left > 0:
+        fade_due += (FADE_PER_SECOND_RAKING if is_raking else FADE_PER_SECOND_IDLE) * game_clock.dt
+        step = min(int(fade_due), fade_steps_left)
+        if step:
+            fade_sand(sand, step)
+            fade_steps_left -= step
+            fade_due = fade_due - step if fade_steps_left else 0.0
+            dirty_rects = [screen.get_rect()]
+
+    # Points whose marks have settled into the sand are no longer needed
+    points.expire(pygame.time.get_ticks() - SETTLE_MS)
+
+    # 3. Drawing (Render) - only what changed
+    for rect in dirty_rects:
+        restore(rect)
+    if overlay.frame() or overlay_toggled or (dirty_rects and overlay.visible):
+        dirty_rects += overlay.draw(screen, restore)
+    if dirty_rects:
+        pygame.display.update(dirty_rects)
 
 # Quit Pygame
-pygame.quit()
\ No newline at end of file
+pygame.quit()